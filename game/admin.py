@@ -1,17 +1,85 @@
+import json
+
 from django.contrib import admin
-from .models import Player, Game, Participation
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
 
+from .models import Club, Player, Game, Participation
 
-@admin.register(Player)
-class PlayerAdmin(admin.ModelAdmin):
+# above that many rows (planner estimate) the changelists show an estimated total
+ESTIMATE_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that doesn't COUNT(*) large results on PostgreSQL.
+
+    An exact count reads every matching row; when the planner expects more than
+    ESTIMATE_THRESHOLD rows its estimate (EXPLAIN) is shown instead, so the
+    number of pages is approximate. Other databases count exactly.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if connections[qs.db].vendor == 'postgresql':
+            # Django dumps each element of PostgreSQL's one-element plan list separately
+            plan = json.loads(qs.explain(format='json'))
+            if isinstance(plan, list):
+                plan = plan[0]
+            estimate = int(plan['Plan']['Plan Rows'])
+            if estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for the tables that grow with every game: a constant number of queries per page."""
+    paginator = EstimatedCountPaginator
+    # don't count the whole table a second time when a filter is applied
+    show_full_result_count = False
+
+
+@admin.register(Club)
+class ClubAdmin(admin.ModelAdmin):
     list_display = ('name', 'created_at')
 
 
+@admin.register(Player)
+class PlayerAdmin(LargeTableAdmin):
+    list_display = ('name', 'club', 'created_at')
+    list_filter = ('club',)
+    list_select_related = ('club',)
+    ordering = ('club', 'name')  # the order of the unique (club, name) index
+    # also used by the player autocomplete widgets of the other admins
+    search_fields = ('name',)
+
+
 @admin.register(Game)
-class GameAdmin(admin.ModelAdmin):
-    list_display = ('id', 'master', 'started_at', 'ended_at')
+class GameAdmin(LargeTableAdmin):
+    list_display = ('id', 'club', 'master', 'started_at', 'ended_at', 'winner_role', 'participant_count')
+    list_filter = ('club', 'winner_role', 'ended_at')
+    list_select_related = ('club', 'master')
+    autocomplete_fields = ('master',)
+
+    def get_queryset(self, request):
+        # correlated count per listed game (served by the (club, game) participation index),
+        # rather than a join + GROUP BY over the whole participation table
+        participants = (Participation.objects.filter(club=OuterRef('club'), game=OuterRef('pk'))
+                        .order_by().values('game').annotate(n=Count('*')).values('n'))
+        return super().get_queryset(request).annotate(participant_count=Coalesce(Subquery(participants), 0))
+
+    @admin.display(description='participants', ordering='participant_count')
+    def participant_count(self, obj):
+        return obj.participant_count
 
 
 @admin.register(Participation)
-class ParticipationAdmin(admin.ModelAdmin):
-    list_display = ('player', 'game', 'role', 'created_at')
+class ParticipationAdmin(LargeTableAdmin):
+    list_display = ('player', 'game', 'role', 'info', 'created_at')
+    list_filter = ('club', 'role', 'info', 'game__winner_role', 'created_at')
+    list_select_related = ('player', 'game')
+    autocomplete_fields = ('player',)
+    raw_id_fields = ('game',)
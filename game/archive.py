@@ -0,0 +1,114 @@
+"""Cold archive of old games.
+
+`archive_games` moves finished games (and their participations) from the live
+tables to `ArchivedGame`/`ArchivedParticipation` and refreshes the compact
+`ArchivedPlayerTotals`/`ArchivedPairTotals` rows read by ``game/stats.py``.
+`restore_games` is the exact reverse. Both run in a single transaction.
+
+For the change log (``game/sync.py``) archived games are deleted from the live
+tables and restored games are created again.
+"""
+from django.db import transaction
+
+from .models import (
+    ArchivedGame, ArchivedPairTotals, ArchivedParticipation, ArchivedPlayerTotals,
+    Game, Participation, Player,
+)
+from . import sync
+from .stats import (
+    PAIR_FIELDS, PLAYER_FIELDS, add_totals, invalidate_club_totals, pair_aggregates, pair_totals,
+    player_aggregates, player_totals,
+)
+
+
+def rebuild_archived_totals():
+    """Recompute the archived per-player and per-pair totals from the archive tables."""
+    ArchivedPlayerTotals.objects.all().delete()
+    ArchivedPairTotals.objects.all().delete()
+    club_of = dict(Player.objects.values_list('id', 'club_id'))
+    ArchivedPlayerTotals.objects.bulk_create(
+        ArchivedPlayerTotals(player_id=pid, club_id=club_of[pid], **row)
+        for pid, row in player_aggregates(ArchivedParticipation.objects.all()).items()
+    )
+    ArchivedPairTotals.objects.bulk_create(
+        ArchivedPairTotals(club_id=club_of[a], player_a_id=a, player_b_id=b, **row)
+        for (a, b), row in pair_aggregates(ArchivedParticipation, ArchivedGame).items()
+    )
+    invalidate_club_totals()
+
+
+@transaction.atomic
+def archive_games(before):
+    """Archive the games that ended before `before`. Returns the number of games moved."""
+    games = list(Game.objects.filter(ended_at__lt=before))
+    if not games:
+        return 0
+    game_ids = [g.id for g in games]
+    participations = list(Participation.objects.filter(game_id__in=game_ids))
+    ArchivedGame.objects.bulk_create(
+        ArchivedGame(id=g.id, club_id=g.club_id, master_id=g.master_id, started_at=g.started_at,
+                     ended_at=g.ended_at, winner_role=g.winner_role)
+        for g in games
+    )
+    ArchivedParticipation.objects.bulk_create(
+        ArchivedParticipation(club_id=p.club_id, player_id=p.player_id, game_id=p.game_id,
+                              role=p.role, info=p.info, created_at=p.created_at)
+        for p in participations
+    )
+    with sync.batch():
+        Game.objects.filter(id__in=game_ids).delete()
+    rebuild_archived_totals()
+    return len(games)
+
+
+@transaction.atomic
+def restore_games(since=None):
+    """Move archived games back to the live tables (only those ended at/after `since` if given)."""
+    archived = ArchivedGame.objects.all()
+    if since is not None:
+        archived = archived.filter(ended_at__gte=since)
+    games = list(archived)
+    if not games:
+        return 0
+    game_ids = [g.id for g in games]
+    Game.objects.bulk_create(
+        Game(id=g.id, club_id=g.club_id, master_id=g.master_id, started_at=g.started_at,
+             ended_at=g.ended_at, winner_role=g.winner_role)
+        for g in games
+    )
+    participations = list(ArchivedParticipation.objects.filter(game_id__in=game_ids))
+    Participation.objects.bulk_create(
+        Participation(club_id=p.club_id, player_id=p.player_id, game_id=p.game_id, role=p.role, info=p.info)
+        for p in participations
+    )
+    # created_at is auto_now_add: put the original timestamps back
+    created_at = {(p.game_id, p.player_id): p.created_at for p in participations}
+    restored = list(Participation.objects.filter(game_id__in=game_ids))
+    for p in restored:
+        p.created_at = created_at[(p.game_id, p.player_id)]
+    Participation.objects.bulk_update(restored, ['created_at'])
+    sync.log_changes([*Game.objects.filter(id__in=game_ids), *restored])
+    ArchivedGame.objects.filter(id__in=game_ids).delete()
+    rebuild_archived_totals()
+    return len(games)
+
+
+def check_consistency():
+    """Compare the combined (archived totals + live) numbers with a computation over every raw row.
+
+    Returns a list of human readable differences, empty when everything matches.
+    """
+    expected_players = {}
+    add_totals(expected_players, player_aggregates(ArchivedParticipation.objects.all()), PLAYER_FIELDS)
+    add_totals(expected_players, player_aggregates(Participation.objects.all()), PLAYER_FIELDS)
+    expected_pairs = {}
+    add_totals(expected_pairs, pair_aggregates(ArchivedParticipation, ArchivedGame), PAIR_FIELDS)
+    add_totals(expected_pairs, pair_aggregates(Participation, Game), PAIR_FIELDS)
+
+    errors = []
+    for label, expected, combined in (('player', expected_players, player_totals()),
+                                      ('pair', expected_pairs, pair_totals())):
+        for key in sorted(set(expected) | set(combined)):
+            if expected.get(key) != combined.get(key):
+                errors.append(f'{label} {key}: expected {expected.get(key)}, got {combined.get(key)}')
+    return errors
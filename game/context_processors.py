@@ -0,0 +1,9 @@
+from .models import Club
+
+
+def clubs(request):
+    # club selector of the page header (base.html)
+    return {
+        'current_club': getattr(request, 'club', None),
+        'clubs': Club.objects.order_by('name'),
+    }
@@ -0,0 +1,149 @@
+"""Lineup win-probability model.
+
+The probability that the villains win a game is modelled as
+
+    P(villain wins) = sigmoid(bias + sum(villain strength of each villain) - sum(kind strength of each kind))
+
+with one "villain" and one "kind" strength per player. The parameters are
+fitted offline on the whole history (live and archived games) by an
+L2-regularised logistic regression (`fit`, run by the `fit_lineup_model`
+command), stored in the single `LineupModel` row and nudged by one online
+gradient step after each ended game (`update_with_game`). Scoring a lineup is
+only a lookup and a sum, and the manage page does it client-side.
+"""
+import math
+
+import numpy as np
+from django.db import transaction
+
+from .models import ArchivedParticipation, LineupModel, Participation
+
+# L2 penalty on the player strengths (keeps rarely seen players close to 0)
+L2 = 1.0
+# learning rate of the online update after each ended game
+ONLINE_LR = 0.05
+
+
+def _history():
+    """Return ({game id: [(player id, role), ...]}, {game id: villains won}) over live and archived games."""
+    lineups = {}
+    outcome = {}
+    for model in (Participation, ArchivedParticipation):
+        rows = (model.objects.filter(game__winner_role__in=('villain', 'kind'))
+                .values_list('game_id', 'player_id', 'role', 'game__winner_role'))
+        for game_id, player_id, role, winner_role in rows:
+            lineups.setdefault(game_id, []).append((player_id, role))
+            outcome[game_id] = winner_role == 'villain'
+    return lineups, outcome
+
+
+def fit(iterations=25):
+    """Fit the model on the full history with Newton's method. Returns (player_ids, params, games)."""
+    lineups, outcome = _history()
+    player_ids = sorted({pid for lineup in lineups.values() for pid, _ in lineup})
+    index = {pid: i for i, pid in enumerate(player_ids)}
+    n = len(player_ids)
+    game_ids = sorted(lineups)
+
+    X = np.zeros((len(game_ids), 1 + 2 * n))
+    X[:, 0] = 1.0
+    for row, game_id in enumerate(game_ids):
+        for pid, role in lineups[game_id]:
+            if role == 'villain':
+                X[row, 1 + index[pid]] = 1.0
+            else:
+                X[row, 1 + n + index[pid]] = -1.0
+    y = np.array([outcome[g] for g in game_ids], dtype=float)
+
+    penalty = np.full(1 + 2 * n, L2)
+    penalty[0] = 0.0  # the bias is not regularised
+    theta = np.zeros(1 + 2 * n)
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-X @ theta))
+        grad = X.T @ (p - y) + penalty * theta
+        hessian = (X.T * (p * (1.0 - p))) @ X + np.diag(penalty) + 1e-9 * np.eye(1 + 2 * n)
+        step = np.linalg.solve(hessian, grad)
+        theta -= step
+        if np.max(np.abs(step)) < 1e-8:
+            break
+    return np.array(player_ids, dtype=np.int64), theta, len(game_ids)
+
+
+def save(player_ids, params, games):
+    LineupModel.objects.update_or_create(pk=1, defaults={
+        'player_ids': np.asarray(player_ids, dtype=np.int64).tobytes(),
+        'params': np.asarray(params, dtype=np.float64).tobytes(),
+        'games': games,
+    })
+
+
+def _decode(model):
+    return (np.frombuffer(bytes(model.player_ids), dtype=np.int64),
+            np.frombuffer(bytes(model.params), dtype=np.float64))
+
+
+def strengths(player_ids=None):
+    """Return (bias, {player id: (villain strength, kind strength)}) or None if no model was fitted.
+
+    Unknown players have a (0, 0) strength. `player_ids` restricts the mapping to those players.
+    """
+    model = LineupModel.objects.filter(pk=1).first()
+    if model is None:
+        return None
+    ids, params = _decode(model)
+    n = len(ids)
+    wanted = None if player_ids is None else set(player_ids)
+    mapping = {int(pid): (float(params[1 + i]), float(params[1 + n + i]))
+               for i, pid in enumerate(ids) if wanted is None or int(pid) in wanted}
+    for pid in wanted or ():
+        mapping.setdefault(pid, (0.0, 0.0))
+    return float(params[0]), mapping
+
+
+def score_lineup(bias, mapping, villains, kinds):
+    """Probability that `villains` beat `kinds` (iterables of player ids) given `strengths()` output."""
+    z = bias
+    z += sum(mapping.get(pid, (0.0, 0.0))[0] for pid in villains)
+    z -= sum(mapping.get(pid, (0.0, 0.0))[1] for pid in kinds)
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+@transaction.atomic
+def update_with_game(game):
+    """Apply one online gradient step for an ended game (no-op without a fitted model or winner)."""
+    if game.winner_role not in ('villain', 'kind'):
+        return
+    model = LineupModel.objects.select_for_update().filter(pk=1).first()
+    if model is None:
+        return
+    ids, params = _decode(model)
+    lineup = list(game.participations.values_list('player_id', 'role'))
+    # players never seen by the model start with a 0 strength
+    new_ids = sorted({pid for pid, _ in lineup} - set(ids.tolist()))
+    n = len(ids)
+    if new_ids:
+        params = np.concatenate([params[:1 + n], np.zeros(len(new_ids)), params[1 + n:], np.zeros(len(new_ids))])
+        ids = np.concatenate([ids, np.array(new_ids, dtype=np.int64)])
+        n = len(ids)
+    else:
+        params = params.copy()
+    index = {int(pid): i for i, pid in enumerate(ids)}
+
+    x = np.zeros(1 + 2 * n)
+    x[0] = 1.0
+    for pid, role in lineup:
+        if role == 'villain':
+            x[1 + index[pid]] = 1.0
+        else:
+            x[1 + n + index[pid]] = -1.0
+    p = 1.0 / (1.0 + math.exp(-float(x @ params)))
+    y = 1.0 if game.winner_role == 'villain' else 0.0
+    params -= ONLINE_LR * (p - y) * x
+    save(ids, params, model.games + 1)
+
+
+def refit():
+    """Fit on the whole history and store the result. Returns the number of games used."""
+    player_ids, params, games = fit()
+    save(player_ids, params, games)
+    return games
@@ -0,0 +1,51 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from game.archive import archive_games, check_consistency, restore_games
+
+
+def _parse_when(value):
+    when = parse_datetime(value)
+    if when is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Invalid date: {value!r} (expected YYYY-MM-DD or an ISO datetime)')
+        when = datetime.combine(day, time.min)
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return when
+
+
+class Command(BaseCommand):
+    help = ("Move games that ended before a cutoff into the archive tables and fold them into "
+            "pre-aggregated totals (--restore moves them back, --check verifies the totals).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='archive games that ended before this date (YYYY-MM-DD)')
+        parser.add_argument('--restore', action='store_true',
+                            help='move archived games back to the live tables (only those ended since --since if given)')
+        parser.add_argument('--since', help='with --restore: only restore games that ended at/after this date')
+        parser.add_argument('--check', action='store_true',
+                            help='check that archived totals + live rows match a computation over every raw row')
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            since = _parse_when(options['since']) if options['since'] else None
+            count = restore_games(since)
+            self.stdout.write(self.style.SUCCESS(f'{count} game(s) restored'))
+        elif options['before']:
+            count = archive_games(_parse_when(options['before']))
+            self.stdout.write(self.style.SUCCESS(f'{count} game(s) archived'))
+        elif not options['check']:
+            raise CommandError('Nothing to do: pass --before DATE, --restore or --check')
+
+        if options['check']:
+            errors = check_consistency()
+            for error in errors:
+                self.stderr.write(error)
+            if errors:
+                raise CommandError(f'{len(errors)} inconsistent total(s)')
+            self.stdout.write(self.style.SUCCESS('Archived totals are consistent'))
@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+
+from game.models import Club, Player
+from game.stats import club_streaks, club_totals, empty_player_totals
+from game.views import player_detail_context, stats_context
+
+
+# the pages' forms can't be posted from a static snapshot: render them without a CSRF token
+# ('NOTPROVIDED' is the value the csrf_token tag silently renders as nothing)
+NO_CSRF = {'csrf_token': 'NOTPROVIDED'}
+
+
+def _player_json(p):
+    return {'id': p.id, 'name': p.name} if p is not None else None
+
+
+class Command(BaseCommand):
+    help = ("Render /stats/, /players/ and every /player/<id>/ page (HTML and JSON) to a static "
+            "directory. Data is loaded once for all pages and unchanged files are not rewritten.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='output directory (e.g. the document root of a static file server)')
+        parser.add_argument('--club', help='name of the club to render (default: the oldest club)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='number of rendering threads (default: number of CPUs)')
+
+    def handle(self, *args, **options):
+        out = Path(options['output'])
+        clubs = Club.objects.order_by('id')
+        club = clubs.filter(name=options['club']).first() if options['club'] else clubs.first()
+        if club is None:
+            raise CommandError('No such club' if options['club'] else 'No club yet')
+
+        # one load of the club's dataset, shared by every page
+        players = list(Player.objects.filter(club=club).order_by('name'))
+        totals, pair_rows = club_totals(club.id)
+        streak_rows = club_streaks(club.id)
+        players_by_id = {p.id: p for p in players}
+        pairs_by_player = defaultdict(dict)
+        for (a, b), row in pair_rows.items():
+            pairs_by_player[a][(a, b)] = row
+            pairs_by_player[b][(a, b)] = row
+
+        # stats_context sets the per-player counters (p.total, ...) used by the players page too,
+        # so it runs before the pages are rendered concurrently
+        stats_ctx = stats_context(players, totals, pair_rows, streak_rows)
+        by_games = sorted(players, key=lambda p: (-p.total, p.name))
+
+        jobs = [
+            ('stats/index.html', lambda: render_to_string('stats.html', {**stats_ctx, **NO_CSRF})),
+            ('stats.json', lambda: json.dumps({
+                'players': [{**_player_json(p), **(totals.get(p.id) or empty_player_totals()),
+                             'streak': streak_rows.get(p.id)} for p in players],
+                'pairs': [{'a': a, 'b': b, **row} for (a, b), row in sorted(pair_rows.items())],
+            })),
+            ('players/index.html', lambda: render_to_string('players.html', {'players': by_games, **NO_CSRF})),
+            ('players.json', lambda: json.dumps([{**_player_json(p), 'total': p.total} for p in by_games])),
+        ]
+        for p in players:
+            ctx = player_detail_context(p, totals.get(p.id), pairs_by_player.get(p.id, {}), players_by_id,
+                                        streak_rows.get(p.id))
+            jobs.append((f'player/{p.id}/index.html',
+                         lambda ctx=ctx: render_to_string('player_detail.html', {**ctx, **NO_CSRF})))
+            jobs.append((f'player/{p.id}.json', lambda ctx=ctx: json.dumps({
+                **ctx,
+                'player': _player_json(ctx['player']),
+                'partners': [{**partner, 'player': _player_json(partner['player'])} for partner in ctx['partners']],
+            })))
+
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            changed = sum(pool.map(lambda job: self._write(out / job[0], job[1]()), jobs))
+        removed = self._remove_stale(out / 'player', {str(p.id) for p in players})
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(jobs)} file(s) rendered: {changed} written, {len(jobs) - changed} unchanged, {removed} stale removed'
+        ))
+
+    def _write(self, path, content):
+        """Write `content` to `path` unless it already holds exactly that. Returns True if written."""
+        data = content.encode('utf-8')
+        try:
+            if path.read_bytes() == data:
+                return False
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so the file server never sees a partial file
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return True
+
+    def _remove_stale(self, player_dir, player_ids):
+        """Remove the pages of players that no longer exist."""
+        if not player_dir.is_dir():
+            return 0
+        removed = 0
+        for entry in player_dir.iterdir():
+            pid = entry.name[:-len('.json')] if entry.name.endswith('.json') else entry.name
+            if not pid.isdigit() or pid in player_ids:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry)
+            else:
+                entry.unlink()
+            removed += 1
+        return removed
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game.models import Club
+from game.sync import compact
+
+
+class Command(BaseCommand):
+    help = ("Delete the change log entries every sync client has applied and those superseded by a "
+            "later change of the same object (run it periodically, e.g. nightly).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--club', help='name of the club to compact (default: every club)')
+
+    def handle(self, *args, **options):
+        club_id = None
+        if options['club']:
+            club = Club.objects.filter(name=options['club']).first()
+            if club is None:
+                raise CommandError('No such club')
+            club_id = club.id
+        deleted = compact(club_id)
+        self.stdout.write(self.style.SUCCESS(f'{deleted} change log entr{"y" if deleted == 1 else "ies"} deleted'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from game.lineup import refit
+
+
+class Command(BaseCommand):
+    help = ("Fit the per-player, per-role strengths used to score lineups on the manage page "
+            "on the full game history and store them in the database.")
+
+    def handle(self, *args, **options):
+        games = refit()
+        self.stdout.write(self.style.SUCCESS(f'Lineup model fitted on {games} game(s)'))
@@ -0,0 +1,26 @@
+from .models import Club
+
+# session key holding the id of the club the user is looking at
+SESSION_KEY = 'club_id'
+
+
+def current_club(request):
+    """The club selected in the session, else the oldest one (created if there is none)."""
+    club_id = request.session.get(SESSION_KEY)
+    club = Club.objects.filter(pk=club_id).first() if club_id else None
+    if club is None:
+        club = Club.objects.order_by('id').first()
+    if club is None:
+        club, _ = Club.objects.get_or_create(name='Défaut')
+    return club
+
+
+class CurrentClubMiddleware:
+    """Set `request.club`, used by the views to scope every query to one club."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.club = current_club(request)
+        return self.get_response(request)
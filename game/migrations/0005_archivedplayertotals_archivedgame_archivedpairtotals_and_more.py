@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0004_alter_participation_info'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPlayerTotals',
+            fields=[
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archived_totals', serialize=False, to='game.player')),
+                ('games', models.PositiveIntegerField(default=0)),
+                ('villains', models.PositiveIntegerField(default=0)),
+                ('kinds', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('villain_wins', models.PositiveIntegerField(default=0)),
+                ('kind_wins', models.PositiveIntegerField(default=0)),
+                ('villain_losses', models.PositiveIntegerField(default=0)),
+                ('kind_losses', models.PositiveIntegerField(default=0)),
+                ('pire', models.PositiveIntegerField(default=0)),
+                ('neutre', models.PositiveIntegerField(default=0)),
+                ('meilleur', models.PositiveIntegerField(default=0)),
+                ('win_pire', models.PositiveIntegerField(default=0)),
+                ('win_neutre', models.PositiveIntegerField(default=0)),
+                ('win_meilleur', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedGame',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('winner_role', models.CharField(blank=True, choices=[('villain', 'Méchant'), ('kind', 'Gentil')], max_length=20, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('master', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_mastered_games', to='game.player')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPairTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('games', models.PositiveIntegerField(default=0)),
+                ('wins_a', models.PositiveIntegerField(default=0)),
+                ('wins_b', models.PositiveIntegerField(default=0)),
+                ('together_villain', models.PositiveIntegerField(default=0)),
+                ('together_kind', models.PositiveIntegerField(default=0)),
+                ('wins_both_villain', models.PositiveIntegerField(default=0)),
+                ('wins_both_kind', models.PositiveIntegerField(default=0)),
+                ('player_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.player')),
+                ('player_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.player')),
+            ],
+            options={
+                'unique_together': {('player_a', 'player_b')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedParticipation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('villain', 'Méchant'), ('kind', 'Gentil')], max_length=20)),
+                ('info', models.CharField(choices=[('pire', 'Pire joueur'), ('neutre', 'Neutre'), ('meilleur', 'Meilleur joueur')], default='neutre', max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='game.archivedgame')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_participations', to='game.player')),
+            ],
+            options={
+                'unique_together': {('player', 'game')},
+            },
+        ),
+    ]
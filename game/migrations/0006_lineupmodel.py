@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0005_archivedplayertotals_archivedgame_archivedpairtotals_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LineupModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('player_ids', models.BinaryField()),
+                ('params', models.BinaryField()),
+                ('games', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def assign_default_club(apps, schema_editor):
+    """Put every existing row in a default club."""
+    Club = apps.get_model('game', 'Club')
+    club, _ = Club.objects.get_or_create(name='Défaut')
+    for model in ('Player', 'Game', 'Participation', 'ArchivedGame', 'ArchivedParticipation',
+                  'ArchivedPlayerTotals', 'ArchivedPairTotals'):
+        apps.get_model('game', model).objects.filter(club__isnull=True).update(club=club)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_lineupmodel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Club',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedgame',
+            name='club',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AddField(
+            model_name='archivedpairtotals',
+            name='club',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AddField(
+            model_name='archivedparticipation',
+            name='club',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AddField(
+            model_name='archivedplayertotals',
+            name='club',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='club',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='games', to='game.club'),
+        ),
+        migrations.AddField(
+            model_name='participation',
+            name='club',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='club',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='players', to='game.club'),
+        ),
+        migrations.RunPython(assign_default_club, migrations.RunPython.noop),
+    ]
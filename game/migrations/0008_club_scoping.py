@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_club'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedgame',
+            name='club',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AlterField(
+            model_name='archivedpairtotals',
+            name='club',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AlterField(
+            model_name='archivedparticipation',
+            name='club',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AlterField(
+            model_name='archivedplayertotals',
+            name='club',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='club',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='games', to='game.club'),
+        ),
+        migrations.AlterField(
+            model_name='participation',
+            name='club',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club'),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='club',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='players', to='game.club'),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='name',
+            field=models.CharField(max_length=150),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['club', '-id'], name='game_game_club_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['club', 'ended_at'], name='game_game_club_ended_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participation',
+            index=models.Index(fields=['club', 'player'], name='game_part_club_player_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participation',
+            index=models.Index(fields=['club', 'game'], name='game_part_club_game_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='player',
+            constraint=models.UniqueConstraint(fields=('club', 'name'), name='game_player_club_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_club_scoping'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='participation',
+            name='game_part_club_player_idx',
+        ),
+        migrations.AddIndex(
+            model_name='participation',
+            index=models.Index(fields=['club', 'player', 'game', 'role'], name='game_part_club_player_game_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_existing_data(apps, schema_editor):
+    """The data written before the change log existed is only available from a snapshot."""
+    Club = apps.get_model('game', 'Club')
+    SyncState = apps.get_model('game', 'SyncState')
+    SyncState.objects.bulk_create(SyncState(club=club, last_seq=1, compacted_seq=1) for club in Club.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_participation_streaks_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('club', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sync_state', serialize=False, to='game.club')),
+                ('last_seq', models.PositiveBigIntegerField(default=0)),
+                ('compacted_seq', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveBigIntegerField()),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('data', models.JSONField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('club', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['club', 'model', 'object_id'], name='game_changelog_club_obj_idx')],
+                'constraints': [models.UniqueConstraint(fields=('club', 'seq'), name='game_changelog_club_seq_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncClient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_id', models.CharField(max_length=64)),
+                ('acked_seq', models.PositiveBigIntegerField(default=0)),
+                ('last_seen', models.DateTimeField(auto_now=True)),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.club')),
+            ],
+            options={
+                'unique_together': {('club', 'client_id')},
+            },
+        ),
+        migrations.RunPython(mark_existing_data, migrations.RunPython.noop),
+    ]
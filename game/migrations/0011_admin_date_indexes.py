@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0010_sync_changelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['ended_at'], name='game_game_ended_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participation',
+            index=models.Index(fields=['created_at'], name='game_part_created_idx'),
+        ),
+    ]
@@ -17,7 +17,8 @@ INFO_CHOICES = (
 INFO_VALUES = [v[0] for v in INFO_CHOICES]
 
 
-class Player(models.Model):
+class Club(models.Model):
+    """An independent group of friends: players, games and stats are all scoped to one club."""
     name = models.CharField(max_length=150, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -25,13 +26,39 @@ class Player(models.Model):
         return self.name
 
 
+# every table below leads its indexes with `club` (the FK's own index would be redundant)
+
+class Player(models.Model):
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='players', db_index=False)
+    name = models.CharField(max_length=150)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # a name is unique within a club (also serves the club-scoped, name-ordered lists)
+            models.UniqueConstraint(fields=['club', 'name'], name='game_player_club_name_uniq'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
 class Game(models.Model):
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='games', db_index=False)
     master = models.ForeignKey(Player, null=True, blank=True, on_delete=models.SET_NULL, related_name='mastered_games')
     started_at = models.DateTimeField(null=True, blank=True)
     ended_at = models.DateTimeField(null=True, blank=True)
     # store which role won the game (villain/kind)
     winner_role = models.CharField(max_length=20, choices=ROLE_CHOICES, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['club', '-id'], name='game_game_club_id_idx'),
+            models.Index(fields=['club', 'ended_at'], name='game_game_club_ended_idx'),
+            # admin date filter across clubs
+            models.Index(fields=['ended_at'], name='game_game_ended_idx'),
+        ]
+
     def is_active(self):
         return self.started_at and not self.ended_at
 
@@ -40,14 +67,173 @@ class Game(models.Model):
 
 
 class Participation(models.Model):
+    # copy of game.club, so per-club aggregates don't need to join game_game
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='+', db_index=False)
     player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='participations')
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='participations')
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     info = models.CharField(max_length=20, choices=INFO_CHOICES, default='neutre')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        unique_together = ('player', 'game')
+        indexes = [
+            # player-ordered scan of a club's results (streaks window functions) without touching the table
+            models.Index(fields=['club', 'player', 'game', 'role'], name='game_part_club_player_game_idx'),
+            models.Index(fields=['club', 'game'], name='game_part_club_game_idx'),
+            # admin date filter
+            models.Index(fields=['created_at'], name='game_part_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.club_id is None:
+            self.club_id = self.game.club_id
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.player} in {self.game} ({self.role})"
+
+
+# --- cold archive ------------------------------------------------------------
+# Old, finished games are moved out of `Game`/`Participation` by the
+# `archive_games` management command (see game/archive.py). The raw rows are kept
+# so the move can be reverted; the stats pages only read the compact totals.
+
+class ArchivedGame(models.Model):
+    # keeps the id the game had in `game_game` so it can be restored as-is
+    id = models.BigIntegerField(primary_key=True)
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='+')
+    master = models.ForeignKey(Player, null=True, blank=True, on_delete=models.SET_NULL, related_name='archived_mastered_games')
+    started_at = models.DateTimeField(null=True, blank=True)
+    ended_at = models.DateTimeField(null=True, blank=True)
+    winner_role = models.CharField(max_length=20, choices=ROLE_CHOICES, null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived game {self.id}"
+
+
+class ArchivedParticipation(models.Model):
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='+')
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='archived_participations')
+    game = models.ForeignKey(ArchivedGame, on_delete=models.CASCADE, related_name='participations')
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    info = models.CharField(max_length=20, choices=INFO_CHOICES, default='neutre')
+    created_at = models.DateTimeField()
+
     class Meta:
         unique_together = ('player', 'game')
 
     def __str__(self):
         return f"{self.player} in {self.game} ({self.role})"
+
+
+class ArchivedPlayerTotals(models.Model):
+    """Pre-aggregated counters of a player over all archived games."""
+    player = models.OneToOneField(Player, primary_key=True, on_delete=models.CASCADE, related_name='archived_totals')
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='+')
+    games = models.PositiveIntegerField(default=0)
+    villains = models.PositiveIntegerField(default=0)
+    kinds = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    villain_wins = models.PositiveIntegerField(default=0)
+    kind_wins = models.PositiveIntegerField(default=0)
+    villain_losses = models.PositiveIntegerField(default=0)
+    kind_losses = models.PositiveIntegerField(default=0)
+    pire = models.PositiveIntegerField(default=0)
+    neutre = models.PositiveIntegerField(default=0)
+    meilleur = models.PositiveIntegerField(default=0)
+    win_pire = models.PositiveIntegerField(default=0)
+    win_neutre = models.PositiveIntegerField(default=0)
+    win_meilleur = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Archived totals of {self.player}"
+
+
+class ArchivedPairTotals(models.Model):
+    """Pre-aggregated counters of two players over the archived games they played together.
+
+    Stored once per pair with `player_a_id < player_b_id`.
+    """
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='+')
+    player_a = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='+')
+    player_b = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='+')
+    games = models.PositiveIntegerField(default=0)
+    wins_a = models.PositiveIntegerField(default=0)
+    wins_b = models.PositiveIntegerField(default=0)
+    together_villain = models.PositiveIntegerField(default=0)
+    together_kind = models.PositiveIntegerField(default=0)
+    wins_both_villain = models.PositiveIntegerField(default=0)
+    wins_both_kind = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('player_a', 'player_b')
+
+    def __str__(self):
+        return f"Archived totals of {self.player_a} & {self.player_b}"
+
+
+class LineupModel(models.Model):
+    """Per-player, per-role strength parameters used to score a villain/kind lineup.
+
+    A single row, fitted by the `fit_lineup_model` command and nudged after each
+    ended game (see game/lineup.py). Both arrays are stored as raw bytes.
+    """
+    # int64 array: player id of each strength index
+    player_ids = models.BinaryField()
+    # float64 array: [bias, villain strength of each player..., kind strength of each player...]
+    params = models.BinaryField()
+    games = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Lineup model ({self.games} games)"
+
+
+# --- delta sync --------------------------------------------------------------
+# Every write to a club's players/games/participations is appended to its change
+# log with a per-club increasing sequence number, so offline clients can sync
+# incrementally (see game/sync.py).
+
+class SyncState(models.Model):
+    """Change-log sequence counter of a club (its row lock orders concurrent writers)."""
+    club = models.OneToOneField(Club, primary_key=True, on_delete=models.CASCADE, related_name='sync_state')
+    last_seq = models.PositiveBigIntegerField(default=0)
+    # entries up to this sequence number may have been compacted away
+    compacted_seq = models.PositiveBigIntegerField(default=0)
+
+
+class ChangeLog(models.Model):
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='+', db_index=False)
+    seq = models.PositiveBigIntegerField()
+    model = models.CharField(max_length=20)  # 'player', 'game' or 'participation'
+    object_id = models.BigIntegerField()
+    # serialized object, None when it was deleted
+    data = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['club', 'seq'], name='game_changelog_club_seq_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['club', 'model', 'object_id'], name='game_changelog_club_obj_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.model} {self.object_id}"
+
+
+class SyncClient(models.Model):
+    """An offline client (e.g. the table-side tablet) and the last sequence number it applied."""
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='+')
+    client_id = models.CharField(max_length=64)
+    acked_seq = models.PositiveBigIntegerField(default=0)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('club', 'client_id')
+
+    def __str__(self):
+        return f"{self.client_id} ({self.club})"
@@ -0,0 +1,186 @@
+"""In-process index of player names for the autocomplete endpoint.
+
+Names are folded (lower-case, accents stripped) so "hélène" and "Helene" match,
+and every word of a name is stored in a sorted array: a prefix lookup is then a
+bisect instead of a table scan. Players are ranked by their number of
+participations. There is one index per club (`get_name_index`), built lazily
+from the database, kept in sync by the signals in ``game/signals.py`` and
+rebuilt every ``REFRESH_SECONDS`` so that other worker processes' writes are
+eventually picked up.
+"""
+import bisect
+import difflib
+import itertools
+import re
+import threading
+import time
+import unicodedata
+
+from django.db.models import Count, F
+from django.db.models.functions import Coalesce
+
+# how long (seconds) an index is trusted before being reloaded from the database
+REFRESH_SECONDS = 300
+
+_WORD_SPLIT = re.compile(r"[\s\-'’._]+")
+
+
+def fold(text):
+    """Return `text` lower-cased and without accents (used for matching only)."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold().strip()
+
+
+def _keys_for(name):
+    folded = fold(name)
+    keys = {folded}
+    keys.update(w for w in _WORD_SPLIT.split(folded) if w)
+    return keys
+
+
+class NameIndex:
+    def __init__(self, club_id):
+        self.club_id = club_id
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._keys = []      # sorted list of (folded key, player id)
+        self._names = {}     # player id -> display name
+        self._folded = {}    # player id -> folded name (ranking and substring matches)
+        self._counts = {}    # player id -> number of participations
+        self._ranking = None  # player ids, most frequent first (rebuilt lazily after a write)
+
+    # -- maintenance -------------------------------------------------------
+
+    def load(self):
+        from .models import Player
+        rows = Player.objects.filter(club_id=self.club_id).annotate(
+            total=Count('participations') + Coalesce(F('archived_totals__games'), 0)
+        ).values_list('id', 'name', 'total')
+        keys = []
+        names = {}
+        folded = {}
+        counts = {}
+        for pid, name, total in rows:
+            names[pid] = name
+            folded[pid] = fold(name)
+            counts[pid] = total
+            keys.extend((k, pid) for k in _keys_for(name))
+        keys.sort()
+        with self._lock:
+            self._keys = keys
+            self._names = names
+            self._folded = folded
+            self._counts = counts
+            self._ranking = None
+            self._loaded_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > REFRESH_SECONDS:
+            self.load()
+
+    def _drop_keys(self, pid):
+        name = self._names.get(pid)
+        if name is None:
+            return
+        for k in _keys_for(name):
+            i = bisect.bisect_left(self._keys, (k, pid))
+            if i < len(self._keys) and self._keys[i] == (k, pid):
+                del self._keys[i]
+
+    def add_player(self, pid, name):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._drop_keys(pid)
+            self._names[pid] = name
+            self._folded[pid] = fold(name)
+            self._counts.setdefault(pid, 0)
+            self._ranking = None
+            for k in _keys_for(name):
+                bisect.insort(self._keys, (k, pid))
+
+    def remove_player(self, pid):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._drop_keys(pid)
+            self._names.pop(pid, None)
+            self._folded.pop(pid, None)
+            self._counts.pop(pid, None)
+            self._ranking = None
+
+    def bump(self, pid, delta):
+        with self._lock:
+            if self._loaded_at is None or pid not in self._counts:
+                return
+            self._counts[pid] = max(0, self._counts[pid] + delta)
+            self._ranking = None
+
+    # -- queries -----------------------------------------------------------
+
+    def _sort_key(self, pid):
+        return -self._counts.get(pid, 0), self._folded[pid]
+
+    def _entries(self, pids):
+        return [{'id': pid, 'name': self._names[pid], 'total': self._counts.get(pid, 0)} for pid in pids]
+
+    def _rank(self, pids, limit):
+        return self._entries(sorted(pids, key=self._sort_key)[:limit])
+
+    def top(self, limit=20, exclude=()):
+        """Most frequent players first, skipping ids in `exclude`."""
+        self._ensure_loaded()
+        with self._lock:
+            if self._ranking is None:
+                self._ranking = sorted(self._names, key=self._sort_key)
+            exclude = set(exclude)
+            return self._entries(itertools.islice((pid for pid in self._ranking if pid not in exclude), limit))
+
+    def search(self, query, limit=10, exclude=()):
+        """Players whose name (or any word of it) starts with `query`.
+
+        Falls back to substring and then close (typo-tolerant) matches when the
+        prefix lookup gives fewer than `limit` results.
+        """
+        folded = fold(query)
+        if not folded:
+            return self.top(limit, exclude)
+        self._ensure_loaded()
+        with self._lock:
+            exclude = set(exclude)
+            found = set()
+            i = bisect.bisect_left(self._keys, (folded,))
+            while i < len(self._keys) and self._keys[i][0].startswith(folded):
+                pid = self._keys[i][1]
+                if pid not in exclude:
+                    found.add(pid)
+                i += 1
+            results = self._rank(found, limit)
+            if len(results) >= limit:
+                return results
+
+            extra = {pid for pid, name in self._folded.items()
+                     if folded in name and pid not in exclude and pid not in found}
+            if not extra and not found:
+                keys = {k for k, pid in self._keys if pid not in exclude}
+                close = set(difflib.get_close_matches(folded, keys, n=limit, cutoff=0.7))
+                extra = {pid for k, pid in self._keys if k in close and pid not in exclude}
+            return results + self._rank(extra, limit - len(results))
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_name_index(club_id):
+    """The (lazily loaded) name index of a club."""
+    index = _indexes.get(club_id)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(club_id, NameIndex(club_id))
+    return index
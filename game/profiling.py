@@ -0,0 +1,126 @@
+"""On-demand profiling of a single request, for staff users.
+
+Add ``?_profile`` to the URL (or send an ``X-Profile: 1`` header) while logged
+in as staff: the request runs under cProfile and every SQL query it sends is
+timed. Two files are written to ``PROFILE_DIR``:
+
+- ``<name>.prof``: pstats data, for ``python -m pstats``, snakeviz or
+  flameprof (flame graph);
+- ``<name>.sql.json``: the SQL timeline (start offset and duration in ms,
+  statement, parameters) and the totals.
+
+The response carries the profile name in an ``X-Profile`` header; stored
+profiles are listed at ``/profiles/``. Only the ``PROFILE_KEEP`` most recent
+profiles are kept. Requests without the parameter/header only pay for the
+dictionary lookups of the check.
+"""
+import cProfile
+import json
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+QUERY_PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+
+# only one profiler can be active in a process: concurrent profiling requests are served unprofiled
+_lock = threading.Lock()
+
+_NAME = re.compile(r'^[\w.-]+$')
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def list_profiles():
+    """Names of the stored profiles, most recent first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    return sorted((p.stem for p in directory.glob('*.prof')), reverse=True)
+
+
+def profile_file(name, kind='prof'):
+    """Path of a stored profile's file (`kind` is 'prof' or 'sql.json'), None if it doesn't exist."""
+    if not _NAME.match(name) or kind not in ('prof', 'sql.json'):
+        return None
+    path = profile_dir() / f'{name}.{kind}'
+    return path if path.is_file() else None
+
+
+class _SqlTimeline:
+    """Database execute wrapper recording when each query ran and how long it took."""
+
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            self.queries.append({
+                'start_ms': round((start - self.started) * 1000, 3),
+                'duration_ms': round((end - start) * 1000, 3),
+                'sql': sql,
+                'params': repr(params)[:500],
+                'many': many,
+            })
+
+
+def _save(request, response, profiler, timeline, elapsed):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r'[^\w]+', '-', request.path).strip('-') or 'index'
+    name = f'{timezone.now():%Y%m%d-%H%M%S-%f}-{slug}'[:120]
+    profiler.dump_stats(directory / f'{name}.prof')
+    (directory / f'{name}.sql.json').write_text(json.dumps({
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'total_ms': round(elapsed * 1000, 3),
+        'sql_ms': round(sum(q['duration_ms'] for q in timeline.queries), 3),
+        'query_count': len(timeline.queries),
+        'queries': timeline.queries,
+    }, indent=1))
+    for old in list_profiles()[settings.PROFILE_KEEP:]:
+        for kind in ('prof', 'sql.json'):
+            (directory / f'{old}.{kind}').unlink(missing_ok=True)
+    return name
+
+
+class ProfilingMiddleware:
+    """Profile the request when a staff user asks for it (see the module docstring)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if QUERY_PARAM not in request.GET and HEADER not in request.META:
+            return self.get_response(request)
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_staff or not _lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            started = time.perf_counter()
+            timeline = _SqlTimeline(started)
+            profiler = cProfile.Profile()
+            with connection.execute_wrapper(timeline):
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            elapsed = time.perf_counter() - started
+        finally:
+            _lock.release()
+        response['X-Profile'] = _save(request, response, profiler, timeline, elapsed)
+        return response
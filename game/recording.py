@@ -0,0 +1,138 @@
+"""Record finished games in one go (used by the `record_game`/`record_games` views).
+
+A payload describes a whole game:
+
+    {
+        "master": "Alice",                      # optional
+        "started_at": "2024-03-01T20:00:00",    # optional, defaults to ended_at
+        "ended_at": "2024-03-01T20:25:00",      # optional, defaults to now
+        "winner_role": "villain",               # optional ("villain" or "kind")
+        "participants": [
+            {"name": "Bob", "role": "villain", "info": "meilleur"},
+            {"name": "Chloé", "role": "kind"},  # info defaults to "neutre"
+        ]
+    }
+
+`record_games` validates every payload, then resolves/creates the players and
+inserts the games and participations with a constant number of statements
+(one select and up to three bulk inserts) in a single transaction, whatever
+the number of games. The bulk inserts rely on the database returning the new
+ids (PostgreSQL, SQLite >= 3.35). They don't send signals, so the club's
+change log, stats cache and name index are updated here.
+"""
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Game, INFO_VALUES, Participation, Player, ROLE_CHOICES
+from .name_index import get_name_index
+from .stats import invalidate_club_totals
+from .sync import log_changes
+
+ROLE_VALUES = [v[0] for v in ROLE_CHOICES]
+NAME_MAX_LENGTH = Player._meta.get_field('name').max_length
+
+# maximum number of games accepted by one `record_games` call
+MAX_GAMES = 500
+
+
+class InvalidGame(ValueError):
+    """A payload can't be recorded; the message says why (shown to the client)."""
+
+
+def _clean_name(value, what):
+    if not isinstance(value, str) or not value.strip():
+        raise InvalidGame(f'{what}: a non-empty name is required')
+    if len(value.strip()) > NAME_MAX_LENGTH:
+        raise InvalidGame(f'{what}: names are limited to {NAME_MAX_LENGTH} characters')
+    return value.strip()
+
+
+def _parse_when(value, what):
+    if value in (None, ''):
+        return None
+    when = parse_datetime(value) if isinstance(value, str) else None
+    if when is None:
+        raise InvalidGame(f'{what}: invalid datetime {value!r}')
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return when
+
+
+def clean_game(payload, position=0):
+    """Validate one payload and return it normalised (raises InvalidGame)."""
+    where = f'game #{position + 1}'
+    if not isinstance(payload, dict):
+        raise InvalidGame(f'{where}: an object is expected')
+    master = payload.get('master')
+    master = _clean_name(master, f'{where} master') if master not in (None, '') else None
+    winner_role = payload.get('winner_role') or None
+    if winner_role is not None and winner_role not in ROLE_VALUES:
+        raise InvalidGame(f'{where}: winner_role must be one of {ROLE_VALUES}')
+    ended_at = _parse_when(payload.get('ended_at'), f'{where} ended_at') or timezone.now()
+    started_at = _parse_when(payload.get('started_at'), f'{where} started_at') or ended_at
+    if started_at > ended_at:
+        raise InvalidGame(f'{where}: started_at is after ended_at')
+
+    participants = payload.get('participants')
+    if not isinstance(participants, list) or not participants:
+        raise InvalidGame(f'{where}: at least one participant is required')
+    cleaned = []
+    seen = set()
+    for p in participants:
+        if not isinstance(p, dict):
+            raise InvalidGame(f'{where}: each participant must be an object')
+        name = _clean_name(p.get('name'), f'{where} participant')
+        if name in seen:
+            raise InvalidGame(f'{where}: {name} is listed twice')
+        seen.add(name)
+        role = p.get('role')
+        if role not in ROLE_VALUES:
+            raise InvalidGame(f'{where}: role of {name} must be one of {ROLE_VALUES}')
+        info = p.get('info') or 'neutre'
+        if info not in INFO_VALUES:
+            raise InvalidGame(f'{where}: info of {name} must be one of {INFO_VALUES}')
+        cleaned.append({'name': name, 'role': role, 'info': info})
+    return {
+        'master': master,
+        'started_at': started_at,
+        'ended_at': ended_at,
+        'winner_role': winner_role,
+        'participants': cleaned,
+    }
+
+
+def record_games(club, payloads):
+    """Validate and insert finished games of `club`. Returns the created Game objects."""
+    if len(payloads) > MAX_GAMES:
+        raise InvalidGame(f'at most {MAX_GAMES} games per request')
+    games = [clean_game(payload, i) for i, payload in enumerate(payloads)]
+    names = {g['master'] for g in games if g['master']}
+    names.update(p['name'] for g in games for p in g['participants'])
+
+    with transaction.atomic():
+        players = {p.name: p for p in Player.objects.filter(club=club, name__in=names)}
+        new_players = Player.objects.bulk_create(
+            Player(club=club, name=name) for name in sorted(names - set(players))
+        )
+        players.update((p.name, p) for p in new_players)
+
+        created = Game.objects.bulk_create(
+            Game(club=club, master=players[g['master']] if g['master'] else None,
+                 started_at=g['started_at'], ended_at=g['ended_at'], winner_role=g['winner_role'])
+            for g in games
+        )
+        participations = Participation.objects.bulk_create(
+            Participation(club=club, game=game, player=players[p['name']], role=p['role'], info=p['info'])
+            for game, g in zip(created, games) for p in g['participants']
+        )
+        log_changes([*new_players, *created, *participations])
+
+    invalidate_club_totals(club.id)
+    index = get_name_index(club.id)
+    for p in new_players:
+        index.add_player(p.id, p.name)
+    for g in games:
+        for p in g['participants']:
+            index.bump(players[p['name']].id, 1)
+    return created
@@ -0,0 +1,74 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Club, Game, Participation, Player
+from .name_index import get_name_index
+from .sync import log_change
+from .stats import invalidate_club_totals
+
+
+# keep the in-process autocomplete index of the club in sync with player/participation writes
+
+@receiver(post_save, sender=Player)
+def index_player_saved(sender, instance, **kwargs):
+    get_name_index(instance.club_id).add_player(instance.id, instance.name)
+
+
+@receiver(post_delete, sender=Player)
+def index_player_deleted(sender, instance, **kwargs):
+    get_name_index(instance.club_id).remove_player(instance.id)
+
+
+@receiver(post_save, sender=Participation)
+def index_participation_saved(sender, instance, created, **kwargs):
+    if created:
+        get_name_index(instance.club_id).bump(instance.player_id, 1)
+
+
+@receiver(post_delete, sender=Participation)
+def index_participation_deleted(sender, instance, **kwargs):
+    get_name_index(instance.club_id).bump(instance.player_id, -1)
+
+
+# any write to a club's players/games/participations invalidates its cached stats
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+@receiver(post_save, sender=Participation)
+@receiver(post_delete, sender=Participation)
+def invalidate_stats(sender, instance, **kwargs):
+    invalidate_club_totals(instance.club_id)
+
+
+# append every write to the club's change log (see game/sync.py)
+
+def _club_deleted(origin):
+    # a deleted club takes its change log along: its cascading deletes are not logged
+    return isinstance(origin, Club) or getattr(origin, 'model', None) is Club
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=Participation)
+def log_saved(sender, instance, **kwargs):
+    log_change(instance)
+
+
+@receiver(post_delete, sender=Player)
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=Participation)
+def log_deleted(sender, instance, origin=None, **kwargs):
+    if not _club_deleted(origin):
+        log_change(instance, deleted=True)
+
+
+@receiver(pre_delete, sender=Player)
+def log_master_cleared(sender, instance, origin=None, **kwargs):
+    # Game.master is SET_NULL: the deletion updates those games without sending post_save
+    if _club_deleted(origin):
+        return
+    for game in Game.objects.filter(master=instance):
+        game.master_id = None
+        log_change(game)
@@ -0,0 +1,241 @@
+"""Per-player and per-pair aggregates used by the stats pages.
+
+Totals are the sum of the pre-aggregated rows of archived games
+(`ArchivedPlayerTotals`, `ArchivedPairTotals`, see ``game/archive.py``) and of
+the live `Participation` rows, so callers don't need to know whether a game has
+been archived.
+
+Everything is scoped to a club; `club_totals` caches a whole club's counters
+(see `invalidate_club_totals`, called by the signals in ``game/signals.py``).
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, Q
+
+from .models import (
+    ArchivedGame, ArchivedPairTotals, ArchivedParticipation, ArchivedPlayerTotals, Club, Game, Participation,
+)
+
+# number of most recent games of the "form" indicator
+FORM_GAMES = 10
+
+# safety net for writes that don't go through the signals (e.g. other processes with a local cache)
+STATS_CACHE_SECONDS = 300
+
+# counters kept per player; losses by style are `<style> - win_<style>`
+PLAYER_FIELDS = (
+    'games', 'villains', 'kinds',
+    'wins', 'villain_wins', 'kind_wins', 'villain_losses', 'kind_losses',
+    'pire', 'neutre', 'meilleur', 'win_pire', 'win_neutre', 'win_meilleur',
+)
+
+# counters kept per pair of players (a, b) with a < b
+PAIR_FIELDS = (
+    'games', 'wins_a', 'wins_b',
+    'together_villain', 'together_kind', 'wins_both_villain', 'wins_both_kind',
+)
+
+
+def empty_player_totals():
+    return dict.fromkeys(PLAYER_FIELDS, 0)
+
+
+def player_aggregates(participations):
+    """Compute the PLAYER_FIELDS counters of a Participation-like queryset, by player id."""
+    won = Q(role=F('game__winner_role'))
+    rows = participations.values('player_id').annotate(
+        games=Count('id'),
+        villains=Count('id', filter=Q(role='villain')),
+        kinds=Count('id', filter=Q(role='kind')),
+        wins=Count('id', filter=won),
+        villain_wins=Count('id', filter=Q(role='villain', game__winner_role='villain')),
+        kind_wins=Count('id', filter=Q(role='kind', game__winner_role='kind')),
+        villain_losses=Count('id', filter=Q(role='villain', game__winner_role='kind')),
+        kind_losses=Count('id', filter=Q(role='kind', game__winner_role='villain')),
+        pire=Count('id', filter=Q(info='pire')),
+        neutre=Count('id', filter=Q(info='neutre')),
+        meilleur=Count('id', filter=Q(info='meilleur')),
+        win_pire=Count('id', filter=won & Q(info='pire')),
+        win_neutre=Count('id', filter=won & Q(info='neutre')),
+        win_meilleur=Count('id', filter=won & Q(info='meilleur')),
+    ).order_by()
+    return {r.pop('player_id'): r for r in rows}
+
+
+def pair_aggregates(participation_model, game_model, player_id=None, club_id=None):
+    """Compute the PAIR_FIELDS counters from raw participation/game tables, by (a, b) ids.
+
+    Used both for the live tables and for the archive tables, which share the
+    same columns. When `player_id` is given only the pairs including it are
+    returned, when `club_id` is given only the club's games are read.
+    """
+    conditions = []
+    params = []
+    if club_id is not None:
+        conditions.append('p1.club_id = %s')
+        params.append(club_id)
+    if player_id is not None:
+        conditions.append('(p1.player_id = %s OR p2.player_id = %s)')
+        params += [player_id, player_id]
+    where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+    sql = f'''
+        SELECT p1.player_id, p2.player_id,
+               COUNT(*),
+               SUM(CASE WHEN g.winner_role = p1.role THEN 1 ELSE 0 END),
+               SUM(CASE WHEN g.winner_role = p2.role THEN 1 ELSE 0 END),
+               SUM(CASE WHEN p1.role = 'villain' AND p2.role = 'villain' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN p1.role = 'kind' AND p2.role = 'kind' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN p1.role = 'villain' AND p2.role = 'villain' AND g.winner_role = 'villain' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN p1.role = 'kind' AND p2.role = 'kind' AND g.winner_role = 'kind' THEN 1 ELSE 0 END)
+        FROM {participation_model._meta.db_table} p1
+        JOIN {participation_model._meta.db_table} p2 ON p1.game_id = p2.game_id AND p1.player_id < p2.player_id
+        JOIN {game_model._meta.db_table} g ON g.id = p1.game_id
+        {where}
+        GROUP BY p1.player_id, p2.player_id
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {(row[0], row[1]): dict(zip(PAIR_FIELDS, (v or 0 for v in row[2:])))
+                for row in cursor.fetchall()}
+
+
+def add_totals(into, rows, fields):
+    """Add the counters of `rows` to `into` (both keyed the same way) and return `into`."""
+    for key, row in rows.items():
+        acc = into.setdefault(key, dict.fromkeys(fields, 0))
+        for f in fields:
+            acc[f] += row[f] or 0
+    return into
+
+
+def player_totals(player_id=None, club_id=None):
+    """Archived + live PLAYER_FIELDS counters, by player id (only `player_id`/`club_id`'s players if given)."""
+    archived = ArchivedPlayerTotals.objects.all()
+    live = Participation.objects.all()
+    if club_id is not None:
+        archived = archived.filter(club_id=club_id)
+        live = live.filter(club_id=club_id)
+    if player_id is not None:
+        archived = archived.filter(player_id=player_id)
+        live = live.filter(player_id=player_id)
+    totals = {r.pop('player_id'): r for r in archived.values('player_id', *PLAYER_FIELDS)}
+    return add_totals(totals, player_aggregates(live), PLAYER_FIELDS)
+
+
+def pair_totals(player_id=None, club_id=None):
+    """Archived + live PAIR_FIELDS counters, by (a, b) ids (only pairs with `player_id`/in `club_id` if given)."""
+    archived = ArchivedPairTotals.objects.all()
+    if club_id is not None:
+        archived = archived.filter(club_id=club_id)
+    if player_id is not None:
+        archived = archived.filter(Q(player_a_id=player_id) | Q(player_b_id=player_id))
+    totals = {}
+    for r in archived.values('player_a_id', 'player_b_id', *PAIR_FIELDS):
+        totals[(r.pop('player_a_id'), r.pop('player_b_id'))] = r
+    return add_totals(totals, pair_aggregates(Participation, Game, player_id, club_id), PAIR_FIELDS)
+
+
+def streaks(club_id):
+    """Win streaks and recent form of every player of a club, in a single query.
+
+    Returns {player id: {'current', 'longest', 'current_villain', 'longest_villain',
+    'current_kind', 'longest_kind', 'form_wins', 'form'}} where `form` is the list of
+    the results (True = win) of the player's last FORM_GAMES games, oldest first.
+    Games are ordered by `ended_at` (then id); unfinished games and games without
+    a winner are ignored. Archived games are included.
+
+    Runs of wins are found with the gaps-and-islands technique: within a run of
+    consecutive wins, (row number among all games) - (row number among won
+    games) is constant. Portable to SQLite (>= 3.25) and PostgreSQL.
+    """
+    # bit i of the form mask is the result of the player's (i + 1)-th most recent game
+    form_mask = ' '.join(f'WHEN {i + 1} THEN {1 << i}' for i in range(FORM_GAMES))
+    sources = ' UNION ALL '.join(f'''
+        SELECT p.player_id, p.role, g.ended_at, g.id AS game_id,
+               CASE WHEN g.winner_role = p.role THEN 1 ELSE 0 END AS won
+        FROM {part._meta.db_table} p
+        JOIN {game._meta.db_table} g ON g.id = p.game_id
+        WHERE p.club_id = %s AND g.ended_at IS NOT NULL AND g.winner_role IS NOT NULL
+    ''' for part, game in ((Participation, Game), (ArchivedParticipation, ArchivedGame)))
+    sql = f'''
+        WITH results AS ({sources}),
+        numbered AS (
+            SELECT player_id, role, won,
+                   ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY ended_at, game_id) AS rn,
+                   ROW_NUMBER() OVER (PARTITION BY player_id, won ORDER BY ended_at, game_id) AS rn_won,
+                   COUNT(*) OVER (PARTITION BY player_id) AS n,
+                   ROW_NUMBER() OVER (PARTITION BY player_id, role ORDER BY ended_at, game_id) AS rn_role,
+                   ROW_NUMBER() OVER (PARTITION BY player_id, role, won ORDER BY ended_at, game_id) AS rn_role_won,
+                   COUNT(*) OVER (PARTITION BY player_id, role) AS n_role,
+                   ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY ended_at DESC, game_id DESC) AS recent
+            FROM results
+        ),
+        runs AS (
+            SELECT player_id, 'all' AS scope, COUNT(*) AS length,
+                   MAX(CASE WHEN rn = n THEN 1 ELSE 0 END) AS is_current
+            FROM numbered WHERE won = 1
+            GROUP BY player_id, rn - rn_won
+            UNION ALL
+            SELECT player_id, role, COUNT(*),
+                   MAX(CASE WHEN rn_role = n_role THEN 1 ELSE 0 END)
+            FROM numbered WHERE won = 1
+            GROUP BY player_id, role, rn_role - rn_role_won
+        )
+        SELECT player_id, scope, MAX(length), MAX(CASE WHEN is_current = 1 THEN length ELSE 0 END), 0
+        FROM runs GROUP BY player_id, scope
+        UNION ALL
+        SELECT player_id, 'form', SUM(won), COUNT(*),
+               SUM(CASE WHEN won = 1 THEN CASE recent {form_mask} END ELSE 0 END)
+        FROM numbered WHERE recent <= {FORM_GAMES}
+        GROUP BY player_id
+    '''
+    result = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [club_id, club_id])
+        for player_id, scope, a, b, mask in cursor.fetchall():
+            row = result.setdefault(player_id, {
+                'current': 0, 'longest': 0, 'current_villain': 0, 'longest_villain': 0,
+                'current_kind': 0, 'longest_kind': 0, 'form_wins': 0, 'form': [],
+            })
+            if scope == 'form':
+                row['form_wins'] = a
+                row['form'] = [bool(mask >> i & 1) for i in reversed(range(b))]
+            else:
+                suffix = '' if scope == 'all' else f'_{scope}'
+                row[f'longest{suffix}'] = a
+                row[f'current{suffix}'] = b
+    return result
+
+
+def _version_key(club_id):
+    return f'game:stats:version:{club_id}'
+
+
+def _cached(club_id, name, compute):
+    version = cache.get_or_set(_version_key(club_id), 0, None)
+    key = f'game:stats:{name}:{club_id}:{version}'
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, STATS_CACHE_SECONDS)
+    return data
+
+
+def club_totals(club_id):
+    """(player_totals, pair_totals) of a whole club, cached until the club's data changes."""
+    return _cached(club_id, 'totals', lambda: (player_totals(club_id=club_id), pair_totals(club_id=club_id)))
+
+
+def club_streaks(club_id):
+    """`streaks(club_id)`, cached until the club's data changes."""
+    return _cached(club_id, 'streaks', lambda: streaks(club_id))
+
+
+def invalidate_club_totals(club_id=None):
+    """Drop the cached totals of `club_id` (of every club if None)."""
+    club_ids = [club_id] if club_id is not None else Club.objects.values_list('id', flat=True)
+    for cid in club_ids:
+        try:
+            cache.incr(_version_key(cid))
+        except ValueError:
+            cache.set(_version_key(cid), 1, None)
@@ -0,0 +1,204 @@
+"""Change log of the live tables, for clients that sync incrementally (``/sync/``).
+
+Every write to a club's players, games or participations appends a `ChangeLog`
+row holding the object's serialized state (None once deleted) and the club's
+next sequence number. A client keeps the last sequence number it applied (its
+cursor) and asks for the changes after it; applying them in order gives back
+the club's current data. A client without a cursor, or whose cursor is older
+than the compacted part of the log, downloads a `snapshot` first.
+
+Sequence numbers are allocated by updating the club's `SyncState` row inside
+the writing transaction: its row lock serializes the writers of a club, so
+entries become visible in sequence order and a client never skips one that
+commits late.
+
+The signals in ``game/signals.py`` log single saves/deletes; bulk inserts don't
+send signals, so their callers use `log_changes` (``game/recording.py``,
+``game/archive.py``). Inside `batch()` the signal entries are buffered and
+logged at once. Entries are only written in the same transaction as the data
+when the write runs in one: code saving several rows wraps them in
+``transaction.atomic()`` and `batch()`. A save made in autocommit mode is
+logged in its own transaction right after it, so a crash in between loses
+that entry (the data is still in the next snapshot).
+
+Deletions cascading from a deleted club are not logged: the club's log goes
+with it.
+
+`compact` drops the entries every client has applied and the entries
+superseded by a later entry of the same object. Because of the latter, an
+entry may refer to an object whose entry comes later in the log: clients check
+references once they have caught up, not entry by entry.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, Min, OuterRef
+from django.utils import timezone
+
+from .models import ChangeLog, Game, Participation, Player, SyncClient, SyncState
+
+# maximum number of entries returned by one `changes` call
+PAGE_SIZE = 500
+
+# clients not seen for that long no longer hold back the compaction
+# (they get a snapshot if they come back)
+CLIENT_EXPIRY = timedelta(days=90)
+
+
+def serialize(obj):
+    """The synced fields of a Player, Game or Participation."""
+    if isinstance(obj, Player):
+        return {'name': obj.name}
+    if isinstance(obj, Game):
+        return {
+            'master': obj.master_id,
+            'started_at': obj.started_at.isoformat() if obj.started_at else None,
+            'ended_at': obj.ended_at.isoformat() if obj.ended_at else None,
+            'winner_role': obj.winner_role,
+        }
+    return {'player': obj.player_id, 'game': obj.game_id, 'role': obj.role, 'info': obj.info}
+
+
+MODEL_NAMES = {Player: 'player', Game: 'game', Participation: 'participation'}
+
+
+def _reserve(club_id, count):
+    """Reserve `count` sequence numbers of a club; returns the first one. Must run in a transaction."""
+    # the UPDATE takes the row lock, held until the end of the transaction
+    state = SyncState.objects.filter(club_id=club_id)
+    if not state.update(last_seq=F('last_seq') + count):
+        # first write of the club
+        try:
+            with transaction.atomic():
+                SyncState.objects.create(club_id=club_id, last_seq=count)
+            return 1
+        except IntegrityError:
+            # created concurrently
+            state.update(last_seq=F('last_seq') + count)
+    return state.values_list('last_seq', flat=True).get() - count + 1
+
+
+def log_changes(objects, deleted=False):
+    """Append one entry per object (saved, or deleted if `deleted`) to their clubs' logs."""
+    by_club = {}
+    for obj in objects:
+        by_club.setdefault(obj.club_id, []).append(
+            (MODEL_NAMES[type(obj)], obj.pk, None if deleted else serialize(obj))
+        )
+    _write(by_club)
+
+
+def _write(by_club):
+    with transaction.atomic(savepoint=False):
+        for club_id, entries in by_club.items():
+            seq = _reserve(club_id, len(entries))
+            ChangeLog.objects.bulk_create(
+                ChangeLog(club_id=club_id, seq=seq + i, model=model, object_id=object_id, data=data)
+                for i, (model, object_id, data) in enumerate(entries)
+            )
+
+
+_local = threading.local()
+
+
+def log_change(obj, deleted=False):
+    """Log a single save/delete (called by the signals), buffered inside `batch()`."""
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is not None:
+        buffer.setdefault(obj.club_id, []).append(
+            (MODEL_NAMES[type(obj)], obj.pk, None if deleted else serialize(obj))
+        )
+    else:
+        log_changes([obj], deleted)
+
+
+@contextmanager
+def batch():
+    """Buffer the entries logged by the signals and write them at once (e.g. cascading deletes)."""
+    if getattr(_local, 'buffer', None) is not None:
+        yield
+        return
+    _local.buffer = {}
+    try:
+        yield
+        buffered = _local.buffer
+    finally:
+        _local.buffer = None
+    _write(buffered)
+
+
+def current_seq(club_id):
+    return SyncState.objects.filter(club_id=club_id).values_list('last_seq', flat=True).first() or 0
+
+
+def snapshot(club):
+    """The club's current data and the cursor to sync from afterwards."""
+    # read the cursor first: writes made meanwhile are both in the data and replayed after it,
+    # which is harmless since applying an entry overwrites the object
+    cursor = current_seq(club.id)
+    return {
+        'cursor': cursor,
+        'players': [[p.pk, serialize(p)] for p in Player.objects.filter(club=club).order_by('id')],
+        'games': [[g.pk, serialize(g)] for g in Game.objects.filter(club=club).order_by('id')],
+        'participations': [[p.pk, serialize(p)]
+                           for p in Participation.objects.filter(club=club).order_by('id')],
+    }
+
+
+def changes(club, since, limit=PAGE_SIZE):
+    """The entries of `club` after sequence number `since`, oldest first.
+
+    Returns None when entries after `since` may have been compacted away (the
+    client needs a snapshot), otherwise {'cursor', 'more', 'changes'} where
+    each change is [seq, model, object id, data or None if deleted].
+    """
+    state = SyncState.objects.filter(club=club).first()
+    if state is None:
+        # nothing written yet (clubs that existed before the change log have a state)
+        return {'cursor': 0, 'more': False, 'changes': []} if since == 0 else None
+    if since < state.compacted_seq or since > state.last_seq:
+        return None
+    rows = list(ChangeLog.objects.filter(club=club, seq__gt=since).order_by('seq')
+                .values_list('seq', 'model', 'object_id', 'data')[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'cursor': rows[-1][0] if rows else since,
+        'more': more,
+        'changes': [list(row) for row in rows],
+    }
+
+
+def acknowledge(club, client_id, seq):
+    """Record that `client_id` applied the entries of `club` up to `seq`."""
+    SyncClient.objects.update_or_create(club=club, client_id=client_id, defaults={'acked_seq': seq})
+
+
+def compact(club_id=None, now=None):
+    """Compact the logs of `club_id` (of every club if None). Returns the number of entries deleted."""
+    expired = (now or timezone.now()) - CLIENT_EXPIRY
+    states = SyncState.objects.all()
+    if club_id is not None:
+        states = states.filter(club_id=club_id)
+    deleted = 0
+    for club_id in states.values_list('club_id', flat=True):
+        with transaction.atomic():
+            # locked like a write so that compacted_seq can't miss a concurrent entry
+            state = SyncState.objects.select_for_update().filter(club_id=club_id).first()
+            if state is None:
+                # the club was deleted meanwhile
+                continue
+            SyncClient.objects.filter(club_id=state.club_id, last_seen__lt=expired).delete()
+            log = ChangeLog.objects.filter(club_id=state.club_id)
+            # entries superseded by a later entry of the same object: replaying the later one is enough
+            later = log.filter(model=OuterRef('model'), object_id=OuterRef('object_id'), seq__gt=OuterRef('seq'))
+            deleted += log.filter(Exists(later)).delete()[0]
+            # entries every client has applied; without any client, everything can go
+            acked = SyncClient.objects.filter(club_id=state.club_id).aggregate(seq=Min('acked_seq'))['seq']
+            horizon = min(acked, state.last_seq) if acked is not None else state.last_seq
+            if horizon > state.compacted_seq:
+                deleted += log.filter(seq__lte=horizon).delete()[0]
+                SyncState.objects.filter(pk=state.pk).update(compacted_seq=horizon)
+    return deleted
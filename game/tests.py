@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.db.models.sql.compiler import SQLCompiler
+from django.test import TestCase
+
+from .admin import ESTIMATE_THRESHOLD, EstimatedCountPaginator
+from .models import Club, Player
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """The PostgreSQL branch, with the EXPLAIN output mocked (the tests run on any database)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        club = Club.objects.create(name='Test')
+        Player.objects.bulk_create(Player(club=club, name=f'P{i}') for i in range(3))
+
+    def paginator(self):
+        return EstimatedCountPaginator(Player.objects.order_by('id'), 100)
+
+    def on_postgresql(self):
+        connection = mock.Mock(vendor='postgresql')
+        return mock.patch('game.admin.connections', {'default': connection})
+
+    def test_large_estimate_is_used(self):
+        # psycopg returns the JSON plan as a one-element list in a one-column row
+        row = ([{'Plan': {'Node Type': 'Seq Scan', 'Plan Rows': 2500000}}],)
+        with self.on_postgresql(), mock.patch.object(SQLCompiler, 'execute_sql', return_value=[row]):
+            self.assertEqual(self.paginator().count, 2500000)
+
+    def test_small_estimate_counts_exactly(self):
+        plan = f'{{"Plan": {{"Plan Rows": {ESTIMATE_THRESHOLD}}}}}'
+        with self.on_postgresql(), mock.patch('django.db.models.QuerySet.explain', return_value=plan):
+            self.assertEqual(self.paginator().count, 3)
+
+    def test_list_shaped_plan(self):
+        plan = '[{"Plan": {"Plan Rows": 123456}}]'
+        with self.on_postgresql(), mock.patch('django.db.models.QuerySet.explain', return_value=plan):
+            self.assertEqual(self.paginator().count, 123456)
+
+    def test_other_databases_count_exactly(self):
+        with mock.patch('django.db.models.QuerySet.explain') as explain:
+            self.assertEqual(self.paginator().count, 3)
+        explain.assert_not_called()
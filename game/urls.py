@@ -5,8 +5,12 @@ app_name = 'game'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('club/select/', views.select_club, name='select_club'),
+    path('club/create/', views.create_club, name='create_club'),
     path('create_player/', views.create_player, name='create_player'),
     path('create_game/', views.create_game, name='create_game'),
+    path('record_game/', views.record_game, name='record_game'),
+    path('record_games/', views.record_games, name='record_games'),
     path('start_game/<int:game_id>/', views.start_game, name='start_game'),
     path('end_game/<int:game_id>/', views.end_game, name='end_game'),
     path('join_game/<int:game_id>/', views.join_game, name='join_game'),
@@ -16,9 +20,14 @@ urlpatterns = [
     path('delete_game/<int:game_id>/', views.delete_game, name='delete_game'),
     path('delete_player/<int:player_id>/', views.delete_player, name='delete_player'),
     path('players/', views.players_list, name='players_list'),
+    path('players/autocomplete/', views.player_autocomplete, name='player_autocomplete'),
+    path('sync/', views.sync_changes, name='sync_changes'),
+    path('sync/snapshot/', views.sync_snapshot, name='sync_snapshot'),
     path('edit_game/<int:game_id>/', views.edit_game, name='edit_game'),
     path('game/<int:game_id>/', views.game_detail, name='game_detail'),
     path('manage/<int:game_id>/', views.manage_game, name='manage_game'),
     path('rematch/<int:game_id>/', views.rematch, name='rematch'),
     path('remove_participation/<int:game_id>/<int:player_id>/', views.remove_participation, name='remove_participation'),
+    path('profiles/', views.profiles_list, name='profiles_list'),
+    path('profiles/<str:name>/<str:kind>/', views.profile_download, name='profile_download'),
 ]
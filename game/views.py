@@ -1,26 +1,47 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.db.models import Count, Q, F, Case, When, Value, FloatField
-from django.db.models.functions import Round
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Coalesce
+import functools
+import json
 import logging
-from .models import Player, Game, Participation, INFO_VALUES
+from . import lineup, profiling, sync
+from .middleware import SESSION_KEY as CLUB_SESSION_KEY
+from .models import Club, Player, Game, Participation, INFO_VALUES
+from .name_index import get_name_index
+from .recording import InvalidGame, record_games as record_game_payloads
+from .stats import club_streaks, club_totals, empty_player_totals, pair_totals, player_totals
 
 logger = logging.getLogger(__name__)
 
+# number of most frequent players rendered up front on the manage/edit pages;
+# the others are fetched from `player_autocomplete` as the user types
+TOP_PLAYERS = 20
+
 
 def index(request):
-    active_game = Game.objects.filter(started_at__isnull=False, ended_at__isnull=True).first()
-    games = list(Game.objects.order_by('-id')[:10])
-    players = Player.objects.order_by('name')
+    # everything is scoped to the current club (see game/middleware.py)
+    club_games = Game.objects.filter(club=request.club)
+    club_players = Player.objects.filter(club=request.club)
+    active_game = club_games.filter(started_at__isnull=False, ended_at__isnull=True).first()
+    games = list(club_games.select_related('master').prefetch_related('participations__player').order_by('-id')[:10])
+    players = club_players.order_by('name')
 
     # attach available players (not yet in the game) to each game object
     for g in games:
-        g.available_players = Player.objects.exclude(participations__game=g).order_by('name')
+        g.available_players = club_players.exclude(participations__game=g).order_by('name')
 
     # also attach available players to the active game (if any)
     if active_game:
-        active_game.available_players = Player.objects.exclude(participations__game=active_game).order_by('name')
+        active_game.available_players = club_players.exclude(participations__game=active_game).order_by('name')
 
     return render(request, 'index.html', {
         'active_game': active_game,
@@ -29,11 +50,29 @@ def index(request):
     })
 
 
+def select_club(request):
+    """Switch the current club (stored in the session)."""
+    club_id = request.POST.get('club', '')
+    if request.method == 'POST' and club_id.isdigit():
+        club = get_object_or_404(Club, pk=club_id)
+        request.session[CLUB_SESSION_KEY] = club.id
+    return redirect('game:index')
+
+
+def create_club(request):
+    if request.method == 'POST':
+        name = (request.POST.get('name') or '').strip()
+        if name and len(name) <= Club._meta.get_field('name').max_length:
+            club, _ = Club.objects.get_or_create(name=name)
+            request.session[CLUB_SESSION_KEY] = club.id
+    return redirect('game:index')
+
+
 def create_player(request):
     if request.method == 'POST':
         name = request.POST.get('name')
         if name:
-            Player.objects.get_or_create(name=name.strip())
+            Player.objects.get_or_create(club=request.club, name=name.strip())
     # Redirect back to the referring page if available (keeps user on manage/edit pages)
     referer = request.META.get('HTTP_REFERER')
     if referer:
@@ -46,14 +85,14 @@ def create_game(request):
         master_name = request.POST.get('master')
         master = None
         if master_name:
-            master, _ = Player.objects.get_or_create(name=master_name.strip())
-        game = Game.objects.create(master=master)
+            master, _ = Player.objects.get_or_create(club=request.club, name=master_name.strip())
+        game = Game.objects.create(club=request.club, master=master)
         return start_game(request, game.id) # start immediately
     return redirect('game:index')
 
 
 def start_game(request, game_id):
-    game = get_object_or_404(Game, pk=game_id)
+    game = get_object_or_404(Game, pk=game_id, club=request.club)
     game.started_at = timezone.now()
     game.ended_at = None
     game.save()
@@ -61,15 +100,17 @@ def start_game(request, game_id):
 
 
 def end_game(request, game_id):
-    game = get_object_or_404(Game, pk=game_id)
+    game = get_object_or_404(Game, pk=game_id, club=request.club)
+    already_ended = game.ended_at is not None
     game.ended_at = timezone.now()
     # optional: set winner role if posted
     winner_role = request.POST.get('winner_role')
     if winner_role:
         game.winner_role = winner_role
 
-    # If roles/infos for participants were posted (from manage page), update them now
-    try:
+    # the rows and their change log entries (game/sync.py) are written together
+    with transaction.atomic(), sync.batch():
+        # If roles/infos for participants were posted (from manage page), update them now
         for p in game.participations.select_related('player').all():
             # role: checkbox 'villain_<player_id>' means villain when present
             role_field = request.POST.get(f'villain_{p.player.id}')
@@ -80,16 +121,109 @@ def end_game(request, game_id):
             p.role = role
             p.info = info
             p.save()
-    except Exception:
-        # ignore if no role fields posted
-        pass
-
-    game.save()
+        game.save()
+    # nudge the lineup model with this result (only the first time the game is ended)
+    if not already_ended:
+        lineup.update_with_game(game)
     return redirect('game:manage_game', game_id=game.id)
 
 
+def _wants_json(request):
+    return (request.headers.get('x-requested-with') == 'XMLHttpRequest' or
+            'application/json' in request.headers.get('Accept', '') or
+            request.content_type == 'application/json')
+
+
+def _game_payload_from_form(post):
+    """Build a `record_game` payload from form fields (`player`, `role` and `info` are parallel lists)."""
+    names = post.getlist('player')
+    roles = post.getlist('role')
+    infos = post.getlist('info')
+    return {
+        'master': post.get('master'),
+        'started_at': post.get('started_at'),
+        'ended_at': post.get('ended_at'),
+        'winner_role': post.get('winner_role'),
+        'participants': [
+            {'name': name, 'role': roles[i] if i < len(roles) else None, 'info': infos[i] if i < len(infos) else None}
+            for i, name in enumerate(names) if name.strip()
+        ],
+    }
+
+
+def _script_or_csrf(view):
+    """Let scripts call a recording endpoint with a token instead of a CSRF token.
+
+    A request with `Authorization: Bearer <RECORD_API_TOKEN>` skips the CSRF
+    check and records into the club given by the `club` query parameter (id),
+    else the default club. Any other request is CSRF-checked as usual.
+    """
+    @csrf_exempt
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = settings.RECORD_API_TOKEN
+        if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            club_id = request.GET.get('club', '')
+            if club_id:
+                if not club_id.isdigit():
+                    return JsonResponse({'status': 'error', 'message': 'club must be an id'}, status=400)
+                request.club = get_object_or_404(Club, pk=club_id)
+        else:
+            rejected = CsrfViewMiddleware(view).process_view(request, None, (), {})
+            if rejected is not None:
+                return rejected
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@_script_or_csrf
+def record_game(request):
+    """Record a whole finished game (master, participants with role/info, winner, timestamps) at once.
+
+    Accepts a JSON body (see game/recording.py) or form fields. Replaces the
+    create/start/manage/set roles/end sequence when logging a game after the fact.
+    """
+    if request.method != 'POST':
+        return redirect('game:index')
+    try:
+        if request.content_type == 'application/json':
+            payload = json.loads(request.body or b'null')
+        else:
+            payload = _game_payload_from_form(request.POST)
+        game, = record_game_payloads(request.club, [payload])
+    except (InvalidGame, ValueError) as exc:
+        if _wants_json(request):
+            return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+        return redirect('game:index')
+    lineup.update_with_game(game)
+    if _wants_json(request):
+        return JsonResponse({'status': 'ok', 'game_id': game.id})
+    return redirect('game:game_detail', game_id=game.id)
+
+
+@_script_or_csrf
+def record_games(request):
+    """Batch variant of `record_game` for backfilling: a JSON list of games (or {"games": [...]}).
+
+    All the games are recorded in one transaction, or none if one is invalid.
+    The lineup model is not nudged: run `fit_lineup_model` after a backfill.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST a JSON list of games'}, status=405)
+    try:
+        payload = json.loads(request.body or b'null')
+        if isinstance(payload, dict):
+            payload = payload.get('games')
+        if not isinstance(payload, list):
+            raise InvalidGame('a list of games is expected')
+        games = record_game_payloads(request.club, payload)
+    except (InvalidGame, ValueError) as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    return JsonResponse({'status': 'ok', 'game_ids': [g.id for g in games]})
+
+
 def join_game(request, game_id):
-    game = get_object_or_404(Game, pk=game_id)
+    game = get_object_or_404(Game, pk=game_id, club=request.club)
     # refuse normal joins if the game has ended; allow only via edit mode (hidden 'edit' flag)
     if request.method == 'POST':
         if game.ended_at and request.POST.get('edit') != '1':
@@ -100,7 +234,7 @@ def join_game(request, game_id):
         if info not in INFO_VALUES:
             info = 'neutre'
         if player_name and role:
-            player, _ = Player.objects.get_or_create(name=player_name.strip())
+            player, _ = Player.objects.get_or_create(club=request.club, name=player_name.strip())
             Participation.objects.update_or_create(player=player, game=game, defaults={'role': role, 'info': info})
     return redirect('game:index')
 
@@ -111,118 +245,94 @@ def submit_info(request, game_id):
 
 def delete_game(request, game_id):
     if request.method == 'POST':
-        game = get_object_or_404(Game, pk=game_id)
-        game.delete()
+        game = get_object_or_404(Game, pk=game_id, club=request.club)
+        # the cascading deletes are logged at once (game/sync.py)
+        with transaction.atomic(), sync.batch():
+            game.delete()
     return redirect('game:index')
 
 
 def delete_player(request, player_id):
     if request.method == 'POST':
-        player = get_object_or_404(Player, pk=player_id)
-        player.delete()
+        player = get_object_or_404(Player, pk=player_id, club=request.club)
+        # the cascading deletes are logged at once (game/sync.py)
+        with transaction.atomic(), sync.batch():
+            player.delete()
     return redirect('game:index')
 
 
 def stats(request):
-    # wins per player: percentage of games the player won (wins / total participations * 100)
-    wins = Player.objects.annotate(
-        total=Count('participations'),
-        win_count=Count('participations', filter=Q(participations__game__winner_role=F('participations__role')))
-    ).annotate(
-        wins_count=Case(
-            When(total=0, then=Value(0.0)),
-            default=Round(F('win_count') * Value(100.0) / F('total'), 2),
-            output_field=FloatField(),
-        )
-    ).order_by('-wins_count')
-
-    # role counts: separate querysets so we can sort each list independently
-    role_counts_villains = Player.objects.annotate(
-        villains=Count('participations', filter=Q(participations__role='villain')),
-        kinds=Count('participations', filter=Q(participations__role='kind')),
-    ).order_by('-villains')
-
-    role_counts_kinds = Player.objects.annotate(
-        villains=Count('participations', filter=Q(participations__role='villain')),
-        kinds=Count('participations', filter=Q(participations__role='kind')),
-    ).order_by('-kinds')
+    # per-player and per-pair counters (archived totals + live rows), see game/stats.py
+    players = list(Player.objects.filter(club=request.club).order_by('name'))
+    totals, pair_rows = club_totals(request.club.id)
+    return render(request, 'stats.html', stats_context(players, totals, pair_rows, club_streaks(request.club.id)))
+
+
+def stats_context(players, totals, pair_rows, streak_rows):
+    """Context of the stats page from already loaded players (ordered by name), counters and streaks.
+
+    Also used by the `build_snapshot` command, which loads the data once for every page.
+    """
+    for p in players:
+        streak = streak_rows.get(p.id) or {}
+        p.current_streak = streak.get('current', 0)
+        p.longest_streak = streak.get('longest', 0)
+        p.form_wins = streak.get('form_wins', 0)
+        p.form = streak.get('form', [])
+        t = totals.get(p.id) or empty_player_totals()
+        p.total = t['games']
+        p.villains = t['villains']
+        p.kinds = t['kinds']
+        p.villain_wins = t['villain_wins']
+        p.kind_wins = t['kind_wins']
+        p.pire_count = t['pire']
+        p.meilleur_count = t['meilleur']
+        # wins per player: percentage of games the player won (wins / total participations * 100)
+        p.wins_count = round(t['wins'] * 100.0 / t['games'], 2) if t['games'] else 0.0
+
+    def ranked(attr, limit=None):
+        rows = sorted(players, key=lambda p: (-getattr(p, attr), p.name))
+        return rows[:limit] if limit else rows
+
+    wins = ranked('wins_count')
+    # role counts: separate lists so we can sort each one independently
+    role_counts_villains = ranked('villains')
+    role_counts_kinds = ranked('kinds')
 
     # top pairs: count of games where both players participated
-    # keep the raw pairs query for compatibility (top frequent pairs)
-    from django.db import connection
+    players_by_id = {p.id: p for p in players}
     pairs = []
-    with connection.cursor() as cursor:
-        cursor.execute('''
-            SELECT p1.player_id as a, p2.player_id as b,
-                   COUNT(DISTINCT p1.game_id) as cnt,
-                   SUM(CASE WHEN g.winner_role = p1.role THEN 1 ELSE 0 END) as wins_a,
-                   SUM(CASE WHEN g.winner_role = p2.role THEN 1 ELSE 0 END) as wins_b
-            FROM game_participation p1
-            JOIN game_participation p2 ON p1.game_id = p2.game_id AND p1.player_id < p2.player_id
-            LEFT JOIN game_game g ON g.id = p1.game_id
-            GROUP BY a, b
-            ORDER BY cnt DESC
-            LIMIT 20
-        ''')
-        for a, b, cnt, wins_a, wins_b in cursor.fetchall():
-            pa = Player.objects.filter(pk=a).first()
-            pb = Player.objects.filter(pk=b).first()
-            pairs.append({
-                'a': pa,
-                'b': pb,
-                'count': cnt,
-                'wins_a': wins_a or 0,
-                'wins_b': wins_b or 0,
-            })
+    for (a, b), row in sorted(pair_rows.items(), key=lambda item: -item[1]['games'])[:20]:
+        pairs.append({
+            'a': players_by_id.get(a),
+            'b': players_by_id.get(b),
+            'count': row['games'],
+            'wins_a': row['wins_a'],
+            'wins_b': row['wins_b'],
+        })
 
     # Build cross-tab matrices: for each ordered pair (row player, col player) compute
     # percentage of games together that were won by 'kind' and by 'villain'.
-    players = list(Player.objects.order_by('name'))
     player_ids = [p.id for p in players]
-    for k in players :
-        print(f'DEBUG stats: player {k.name} id={k.id}')
-    # precompute game ids per player to speed up intersections
-    game_ids_by_player = {p.id: set(Participation.objects.filter(player=p).values_list('game_id', flat=True)) for p in players}
+    logger.debug('stats: %s players', len(player_ids))
 
     kind_matrix = {pid: {} for pid in player_ids}
     villain_matrix = {pid: {} for pid in player_ids}
     total_matrix = {pid: {} for pid in player_ids}
 
     for pid in player_ids:
-        ids_a = game_ids_by_player.get(pid, set())
         for qid in player_ids:
-            if pid == qid:
+            row = pair_rows.get((pid, qid) if pid < qid else (qid, pid))
+            if pid == qid or row is None:
                 kind_matrix[pid][qid] = None
                 villain_matrix[pid][qid] = None
                 total_matrix[pid][qid] = 0
                 continue
-            ids_b = game_ids_by_player.get(qid, set())
-            common = ids_a.intersection(ids_b)
-            total = len(common)
-            total_matrix[pid][qid] = total
-            if total == 0:
-                kind_matrix[pid][qid] = None
-                villain_matrix[pid][qid] = None
-                continue
-            # count wins where winner_role == 'kind' among common games
-            together_villain = Game.objects.filter(id__in=common, participations__player_id=pid, participations__role='villain')\
-                    .filter(participations__player_id=qid, participations__role='villain')\
-                    .distinct().count()
-
-            together_kind = Game.objects.filter(id__in=common, participations__player_id=pid, participations__role='kind')\
-                  .filter(participations__player_id=qid, participations__role='kind')\
-                  .distinct().count()
-            kinds_wins = Game.objects.filter(id__in=common, participations__player_id=pid, participations__role='kind')\
-                    .filter(participations__player_id=qid, participations__role='kind', winner_role='kind')\
-                    .distinct().count()
-            
-            villains_wins = Game.objects.filter(id__in=common, participations__player_id=pid, participations__role='villain')\
-                    .filter(participations__player_id=qid, participations__role='villain', winner_role='villain')\
-                    .distinct().count()
-            kind_pct = round(kinds_wins / together_kind * 100, 1) if together_kind > 0 else None
-            villain_pct = round(villains_wins / together_villain * 100, 1) if together_villain > 0 else None
-            kind_matrix[pid][qid] = kind_pct
-            villain_matrix[pid][qid] = villain_pct
+            total_matrix[pid][qid] = row['games']
+            together_kind = row['together_kind']
+            together_villain = row['together_villain']
+            kind_matrix[pid][qid] = round(row['wins_both_kind'] / together_kind * 100, 1) if together_kind > 0 else None
+            villain_matrix[pid][qid] = round(row['wins_both_villain'] / together_villain * 100, 1) if together_villain > 0 else None
 
     # determine per-row max/min for highlighting (ignore None)
     row_max_kind = {}
@@ -257,19 +367,13 @@ def stats(request):
             row_min_villain[pid] = None
 
     # additional aggregations used by the template
-    most_played = Player.objects.annotate(total=Count('participations')).order_by('-total')[:20]
-
-    win_counts_villains = Player.objects.annotate(
-        villain_wins=Count('participations', filter=Q(participations__role='villain', participations__game__winner_role='villain'))
-    ).order_by('-villain_wins')[:20]
-    win_counts_kinds = Player.objects.annotate(
-        kind_wins=Count('participations', filter=Q(participations__role='kind', participations__game__winner_role='kind'))
-    ).order_by('-kind_wins')[:20]
+    most_played = ranked('total', 20)
+    win_counts_villains = ranked('villain_wins', 20)
+    win_counts_kinds = ranked('kind_wins', 20)
+    info_counts_pire = ranked('pire_count', 20)
+    info_counts_meilleur = ranked('meilleur_count', 20)
 
-    info_counts_pire = Player.objects.annotate(pire_count=Count('participations', filter=Q(participations__info='pire'))).order_by('-pire_count')[:20]
-    info_counts_meilleur = Player.objects.annotate(meilleur_count=Count('participations', filter=Q(participations__info='meilleur'))).order_by('-meilleur_count')[:20]
-
-    return render(request, 'stats.html', {
+    return {
         'wins': wins,
         'role_counts_villains': role_counts_villains,
         'role_counts_kinds': role_counts_kinds,
@@ -287,51 +391,115 @@ def stats(request):
         'win_counts_kinds': win_counts_kinds,
         'info_counts_pire': info_counts_pire,
         'info_counts_meilleur': info_counts_meilleur,
-    })
+        'current_streaks': [p for p in ranked('current_streak', 10) if p.current_streak],
+        'longest_streaks': [p for p in ranked('longest_streak', 10) if p.longest_streak],
+        'best_form': [p for p in ranked('form_wins', 10) if p.form],
+    }
 
 
 
 def players_list(request):
     # list players as clickable cards with their total number of participations
-    players = Player.objects.annotate(total=Count('participations')).order_by('-total', 'name')
+    # (archived games are counted through their pre-aggregated totals)
+    players = Player.objects.filter(club=request.club).annotate(
+        total=Count('participations') + Coalesce(F('archived_totals__games'), 0)
+    ).order_by('-total', 'name')
     return render(request, 'players.html', {
         'players': players,
     })
 
 
+def player_autocomplete(request):
+    """JSON list of players matching `q` (prefix, accent-insensitive), most frequent first.
+
+    `game` excludes the players already taking part in that game, `limit` caps the result size.
+    """
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 50))
+    except ValueError:
+        limit = 10
+    exclude = []
+    game_id = request.GET.get('game')
+    if game_id and game_id.isdigit():
+        exclude = Participation.objects.filter(club=request.club, game_id=game_id).values_list('player_id', flat=True)
+    return JsonResponse({'results': get_name_index(request.club.id).search(query, limit=limit, exclude=exclude)})
+
+
+# compact separators: sync pages are fetched often and mostly made of small lists
+SYNC_JSON = {'separators': (',', ':')}
+
+
+def sync_changes(request):
+    """JSON page of the current club's changes after the cursor `since` (see game/sync.py).
+
+    `client` identifies the caller: asking for the changes after `since`
+    acknowledges the previous ones, which lets them be compacted. Answers 410
+    when the client must start again from `sync_snapshot`.
+    """
+    try:
+        since = int(request.GET.get('since', ''))
+        limit = max(1, min(int(request.GET.get('limit', sync.PAGE_SIZE)), sync.PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'since must be a cursor'}, status=400)
+    page = sync.changes(request.club, since, limit)
+    if page is None:
+        return JsonResponse({'status': 'reset', 'message': 'cursor too old, fetch a snapshot'}, status=410)
+    client_id = request.GET.get('client', '')[:64]
+    if client_id:
+        sync.acknowledge(request.club, client_id, since)
+    return JsonResponse(page, json_dumps_params=SYNC_JSON)
+
+
+def sync_snapshot(request):
+    """JSON dump of the current club's players, games and participations, with the cursor to sync from."""
+    data = sync.snapshot(request.club)
+    client_id = request.GET.get('client', '')[:64]
+    if client_id:
+        sync.acknowledge(request.club, client_id, data['cursor'])
+    return JsonResponse(data, json_dumps_params=SYNC_JSON)
+
+
 def edit_game(request, game_id):
     # allow adding/removing participants even after a game ended
-    game = get_object_or_404(Game, pk=game_id)
-    # players not in this game
-    available = Player.objects.exclude(participations__game=game).annotate(total=Count('participations')).order_by('-total', 'name')
+    game = get_object_or_404(Game, pk=game_id, club=request.club)
+    confirm_create = None
     if request.method == 'POST':
         action = request.POST.get('action')
         if action == 'select_players' or action == 'add':
             # add participant (same as join in edit mode)
-            player_name = request.POST.get('player')
+            player_name = (request.POST.get('player') or '').strip()
             role = request.POST.get('role')
             info = request.POST.get('info', 'neutre')
             if info not in INFO_VALUES:
                 info = 'neutre'
             if player_name and role:
-                player, _ = Player.objects.get_or_create(name=player_name.strip())
-                Participation.objects.update_or_create(player=player, game=game, defaults={'role': role, 'info': info})
-            return redirect('game:edit_game', game_id=game.id)
+                player = Player.objects.filter(club=request.club, name=player_name).first()
+                if player is None and request.POST.get('create') == '1':
+                    player = Player.objects.create(club=request.club, name=player_name)
+                if player is not None:
+                    Participation.objects.update_or_create(player=player, game=game, defaults={'role': role, 'info': info})
+                else:
+                    # unknown name (a typo?): ask before creating a new player
+                    confirm_create = {'name': player_name, 'role': role, 'info': info}
+            if confirm_create is None:
+                return redirect('game:edit_game', game_id=game.id)
         elif action == 'set_roles':
             # update role/info for each participation and optionally winner_role
-            for p in game.participations.select_related('player').all():
-                role_field = request.POST.get(f'villain_{p.player.id}')
-                role = 'villain' if role_field == 'on' or role_field == '1' else 'kind'
-                info = request.POST.get(f'info_{p.player.id}', '')
-                if info not in INFO_VALUES:
-                    info = p.info
-                p.role = role
-                p.info = info
-                p.save()
-            winner_role = request.POST.get('winner_role')
-            if winner_role:
-                game.winner_role = winner_role
-                game.save()
+            with transaction.atomic(), sync.batch():
+                for p in game.participations.select_related('player').all():
+                    role_field = request.POST.get(f'villain_{p.player.id}')
+                    role = 'villain' if role_field == 'on' or role_field == '1' else 'kind'
+                    info = request.POST.get(f'info_{p.player.id}', '')
+                    if info not in INFO_VALUES:
+                        info = p.info
+                    p.role = role
+                    p.info = info
+                    p.save()
+                winner_role = request.POST.get('winner_role')
+                if winner_role:
+                    game.winner_role = winner_role
+                    game.save()
             return redirect('game:edit_game', game_id=game.id)
         elif action == 'remove_participation':
             # remove participation (edit mode allowed even if game ended)
@@ -341,15 +509,18 @@ def edit_game(request, game_id):
             return redirect('game:edit_game', game_id=game.id)
 
     participants = game.participations.select_related('player').annotate(player_games=Count('player__participations')).order_by('-player_games', 'player__name')
+    # most frequent players not in this game; the rest come from the autocomplete endpoint
+    available = get_name_index(request.club.id).top(TOP_PLAYERS, exclude=[p.player_id for p in participants])
     return render(request, 'edit_game.html', {
         'game': game,
         'available': available,
         'participants': participants,
+        'confirm_create': confirm_create,
     })
 
 
 def game_detail(request, game_id):
-    game = get_object_or_404(Game, pk=game_id)
+    game = get_object_or_404(Game, pk=game_id, club=request.club)
     participants = game.participations.select_related('player').all()
     # determine for each participation whether that player is considered a winner in this game
     # a participation 'wins' when its role == game.winner_role
@@ -377,7 +548,7 @@ def manage_game(request, game_id):
     - sélectionner les joueurs disponibles (action=select_players)
     - définir rôle/info pour chaque participant (action=set_roles)
     """
-    game = get_object_or_404(Game, pk=game_id)
+    game = get_object_or_404(Game, pk=game_id, club=request.club)
 
     # Handle POST actions from the manage page
     if request.method == 'POST':
@@ -385,34 +556,50 @@ def manage_game(request, game_id):
         if action == 'select_players':
             # multiple checkbox values 'player_id' or names
             selected = request.POST.getlist('player')
-            for name in selected:
-                if not name:
-                    continue
-                player, _ = Player.objects.get_or_create(name=name.strip())
-                # default role = 'kind'
-                Participation.objects.get_or_create(player=player, game=game, defaults={'role': 'kind'})
+            with transaction.atomic(), sync.batch():
+                for name in selected:
+                    if not name:
+                        continue
+                    player, _ = Player.objects.get_or_create(club=request.club, name=name.strip())
+                    # default role = 'kind'
+                    Participation.objects.get_or_create(player=player, game=game, defaults={'role': 'kind'})
             return redirect('game:manage_game', game_id=game.id)
         elif action == 'set_roles':
             # update role/info for each participation
-            for p in game.participations.select_related('player').all():
-                # role checkbox: if 'villain_{player_id}' present -> villain else kind
-                role_field = request.POST.get(f'villain_{p.player.id}')
-                role = 'villain' if role_field == 'on' or role_field == '1' else 'kind'
-                info = request.POST.get(f'info_{p.player.id}', '')
-                if info not in INFO_VALUES:
-                    info = p.info
-                p.role = role
-                p.info = info
-                p.save()
+            with transaction.atomic(), sync.batch():
+                for p in game.participations.select_related('player').all():
+                    # role checkbox: if 'villain_{player_id}' present -> villain else kind
+                    role_field = request.POST.get(f'villain_{p.player.id}')
+                    role = 'villain' if role_field == 'on' or role_field == '1' else 'kind'
+                    info = request.POST.get(f'info_{p.player.id}', '')
+                    if info not in INFO_VALUES:
+                        info = p.info
+                    p.role = role
+                    p.info = info
+                    p.save()
             return redirect('game:manage_game', game_id=game.id)
 
     # GET: render page with available players and current participants
-    available = Player.objects.exclude(participations__game=game).annotate(total=Count('participations')).order_by('-total', 'name')
     participants = game.participations.select_related('player').all().order_by('player__name')
+    available = get_name_index(request.club.id).top(TOP_PLAYERS, exclude=[p.player_id for p in participants])
+    # lineup strengths of the participants: the page scores the villain/kind split client-side
+    lineup_model = None
+    villain_win_pct = None
+    model = lineup.strengths([p.player_id for p in participants])
+    if model is not None and participants:
+        bias, mapping = model
+        lineup_model = {'bias': bias, 'players': {pid: list(s) for pid, s in mapping.items()}}
+        villain_win_pct = round(100 * lineup.score_lineup(
+            bias, mapping,
+            [p.player_id for p in participants if p.role == 'villain'],
+            [p.player_id for p in participants if p.role != 'villain'],
+        ), 1)
     return render(request, 'manage_game.html', {
         'game': game,
         'available': available,
         'participants': participants,
+        'lineup_model': lineup_model,
+        'villain_win_pct': villain_win_pct,
     })
 
 
@@ -420,20 +607,21 @@ def rematch(request, game_id):
     """Create a new game pre-filled with the same participants as <game_id> and redirect to manage page."""
     if request.method != 'POST':
         return redirect('game:index')
-    old = get_object_or_404(Game, pk=game_id)
-    # create new game with same master
-    new_game = Game.objects.create(master=old.master)
-    # copy participations
-    for p in old.participations.all():
-        Participation.objects.get_or_create(player=p.player, game=new_game, defaults={'role': 'kind'})
-    return start_game(request, new_game.id)
+    old = get_object_or_404(Game, pk=game_id, club=request.club)
+    with transaction.atomic(), sync.batch():
+        # create new game with same master
+        new_game = Game.objects.create(club=old.club, master=old.master)
+        # copy participations
+        for p in old.participations.all():
+            Participation.objects.get_or_create(player_id=p.player_id, game=new_game, defaults={'role': 'kind'})
+        return start_game(request, new_game.id)
 
 
 def remove_participation(request, game_id, player_id):
     """Remove a Participation (player from game). Accepts POST (AJAX or form).
     Only allowed when the game has not ended from the manage page context.
     """
-    game = get_object_or_404(Game, pk=game_id)
+    game = get_object_or_404(Game, pk=game_id, club=request.club)
     if request.method == 'POST':
         # allow removal in edit mode even if game ended when caller includes edit=1
         if game.ended_at and request.POST.get('edit') != '1':
@@ -453,77 +641,55 @@ def remove_participation(request, game_id, player_id):
     return redirect('game:manage_game', game_id=game.id)
 
 def player_detail(request, player_id):
-    player = get_object_or_404(Player, pk=player_id)
-    # total participations (games played)
-    from django.db.models import F
-    total_games = player.participations.count()
-    # wins: count participations where the participation.role equals the game's winner_role
-    wins_count = Participation.objects.filter(player=player).filter(role=F('game__winner_role')).count()
-    cnt_villains = player.participations.filter(role='villain').count()
-    cnt_kinds = player.participations.filter(role='kind').count()
+    player = get_object_or_404(Player, pk=player_id, club=request.club)
+    # counters over all the player's games (archived totals + live rows), see game/stats.py
+    t = player_totals(player.id).get(player.id)
+    pair_rows = pair_totals(player.id)
+    partner_players = Player.objects.in_bulk([b if a == player.id else a for a, b in pair_rows])
+    # streaks are computed for the whole club in one query (and cached), see game/stats.py
+    streak = club_streaks(request.club.id).get(player.id)
+    return render(request, 'player_detail.html', player_detail_context(player, t, pair_rows, partner_players, streak))
+
+
+def player_detail_context(player, t, pair_rows, players_by_id, streak=None):
+    """Context of a player page from its counters `t`, the pair counters including it,
+    players by id and its `streaks()` row."""
+    t = t or empty_player_totals()
+    total_games = t['games']
+    # wins: participations where the participation.role equals the game's winner_role
+    wins_count = t['wins']
+    cnt_villains = t['villains']
+    cnt_kinds = t['kinds']
     pct_games_villain = round((cnt_villains / total_games * 100),1) if total_games > 0 else 0
     pct_games_kind = round((cnt_kinds / total_games * 100),1) if total_games > 0 else 0
     losses = total_games - wins_count
     win_pct = (wins_count / total_games * 100) if total_games > 0 else 0
-    wins_villain = player.participations.filter(role='villain', game__winner_role='villain').count()
-    wins_kind = player.participations.filter(role='kind', game__winner_role='kind').count()
-    losses_villain = player.participations.filter(role='villain', game__winner_role='kind').count()
-    losses_kind = player.participations.filter(role='kind', game__winner_role='villain').count()
+    wins_villain = t['villain_wins']
+    wins_kind = t['kind_wins']
+    losses_villain = t['villain_losses']
+    losses_kind = t['kind_losses']
     pct_wins_villain = round((wins_villain / cnt_villains * 100),1) if cnt_villains > 0 else 0
     pct_wins_kind = round((wins_kind / cnt_kinds * 100),1) if cnt_kinds > 0 else 0
-    # partners: who played with this player, counts and wins when together
-    partners = []
-    # get game ids the player participated in
-    game_ids = list(Participation.objects.filter(player=player).values_list('game_id', flat=True))
-    logger.debug('player_detail: player=%s total_games=%s', player.id, len(game_ids))
-    print(f'DEBUG player_detail: player={player.id} total_games={len(game_ids)}')
-    # top partners by distinct games together using ORM
-    partner_rows_qs = (Participation.objects
-                    .filter(game_id__in=game_ids)
-                    .exclude(player=player)
-                    .values('player')
-                    .annotate(cnt=Count('game_id', distinct=True))
-                    .order_by('-cnt')[:20])
-
-    partner_rows = list(partner_rows_qs)
-    logger.debug('player_detail: found %s partner rows', len(partner_rows))
-    print(f'DEBUG player_detail: found {len(partner_rows)} partner rows -> {partner_rows}')
-
-    for row in partner_rows:
-        partner_id = row['player']
-        part = Player.objects.filter(pk=partner_id).first()
-        # use ORM for accurate, readable counts on the games where both played
-        games_qs = Game.objects.filter(id__in=game_ids).filter(participations__player=part).distinct()
-        # totals
-        together_count = games_qs.count()
-        logger.debug('player_detail partner %s: games_qs_count=%s', partner_id, games_qs.count())
-        print(f'DEBUG partner {partner_id}:games_qs_count={games_qs.count()}')
-        # games where both specific players had the villain/kind role
-        together_villain = Game.objects.filter(id__in=game_ids, participations__player=player, participations__role='villain')\
-                    .filter(participations__player=part, participations__role='villain')\
-                    .distinct().count()
-        together_kind = Game.objects.filter(id__in=game_ids, participations__player=player, participations__role='kind')\
-                  .filter(participations__player=part, participations__role='kind')\
-                  .distinct().count()
-        # wins where both specific players were villain/kind and that side won
-        wins_both_villain = Game.objects.filter(id__in=game_ids, participations__player=player, participations__role='villain')\
-                    .filter(participations__player=part, participations__role='villain', winner_role='villain')\
-                    .distinct().count()
-        wins_both_kind = Game.objects.filter(id__in=game_ids, participations__player=player, participations__role='kind')\
-                      .filter(participations__player=part, participations__role='kind', winner_role='kind')\
-                      .distinct().count()
-
-        total = together_count or 0
+    logger.debug('player_detail: player=%s total_games=%s', player.id, total_games)
 
+    # partners: who played with this player, counts and wins when together (top 20 by games together)
+    partner_rows = sorted(pair_rows.items(), key=lambda item: -item[1]['games'])[:20]
+    logger.debug('player_detail: found %s partner rows', len(partner_rows))
+    partners = []
+    for (a, b), row in partner_rows:
+        partner_id = b if a == player.id else a
+        together_villain = row['together_villain']
+        together_kind = row['together_kind']
+        wins_both_villain = row['wins_both_villain']
+        wins_both_kind = row['wins_both_kind']
         wins_same_team = wins_both_villain + wins_both_kind
         together_play_same_team = together_villain + together_kind
         win_pct_partner = round((wins_same_team / together_play_same_team * 100), 1) if together_play_same_team > 0 else 0
-        logger.debug('player_detail partner %s summary: wins_same_team=%s total=%s win_pct=%s', partner_id, wins_same_team, total, win_pct_partner)
-        print(f'DEBUG partner {partner_id} summary: wins_same_team={wins_same_team} total={total} win_pct={win_pct_partner}')
-        
+        logger.debug('player_detail partner %s summary: wins_same_team=%s total=%s win_pct=%s', partner_id, wins_same_team, row['games'], win_pct_partner)
+
         partners.append({
-            'player': part,
-            'count': total,
+            'player': players_by_id.get(partner_id),
+            'count': row['games'],
             'together_play_same_team': together_play_same_team,
             'wins_partner': wins_same_team,
             'together_villain': together_villain,
@@ -535,28 +701,13 @@ def player_detail(request, player_id):
             'win_pct': win_pct_partner,
         })
     # info distribution overall and when player's side won/lost
-    info_qs = Participation.objects.filter(player=player).values('info').annotate(cnt=Count('id'))
-    cnt_pire = 0; cnt_neutre = 0; cnt_meilleur = 0
-    for it in info_qs:
-        if it['info'] == 'pire': cnt_pire = it['cnt']
-        if it['info'] == 'neutre': cnt_neutre = it['cnt']
-        if it['info'] == 'meilleur': cnt_meilleur = it['cnt']
-
-    info_win_qs = Participation.objects.filter(player=player, role=F('game__winner_role')).values('info').annotate(cnt=Count('id'))
-    win_pire = win_neutre = win_meilleur = 0
-    for it in info_win_qs:
-        if it['info'] == 'pire': win_pire = it['cnt']
-        if it['info'] == 'neutre': win_neutre = it['cnt']
-        if it['info'] == 'meilleur': win_meilleur = it['cnt']
-
-    info_loss_qs = Participation.objects.filter(player=player).exclude(role=F('game__winner_role')).values('info').annotate(cnt=Count('id'))
-    loss_pire = loss_neutre = loss_meilleur = 0
-    for it in info_loss_qs:
-        if it['info'] == 'pire': loss_pire = it['cnt']
-        if it['info'] == 'neutre': loss_neutre = it['cnt']
-        if it['info'] == 'meilleur': loss_meilleur = it['cnt']
-
-    return render(request, 'player_detail.html', {
+    cnt_pire, cnt_neutre, cnt_meilleur = t['pire'], t['neutre'], t['meilleur']
+    win_pire, win_neutre, win_meilleur = t['win_pire'], t['win_neutre'], t['win_meilleur']
+    loss_pire = cnt_pire - win_pire
+    loss_neutre = cnt_neutre - win_neutre
+    loss_meilleur = cnt_meilleur - win_meilleur
+
+    return {
         'player': player,
         'total_games': total_games,
         'total_games_villain': cnt_villains,
@@ -583,4 +734,23 @@ def player_detail(request, player_id):
         'loss_pire': loss_pire,
         'loss_neutre': loss_neutre,
         'loss_meilleur': loss_meilleur,
-    })
+        'streak': streak or {},
+    }
+
+
+@staff_member_required
+def profiles_list(request):
+    """JSON list of the stored request profiles (see game/profiling.py), most recent first."""
+    return JsonResponse({'profiles': [{
+        'name': name,
+        'prof': reverse('game:profile_download', args=[name, 'prof']),
+        'sql': reverse('game:profile_download', args=[name, 'sql.json']),
+    } for name in profiling.list_profiles()]})
+
+
+@staff_member_required
+def profile_download(request, name, kind):
+    path = profiling.profile_file(name, kind)
+    if path is None:
+        raise Http404('No such profile')
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""Measure cold start and steady-state latency of the main views.
+
+Cold start is the time from importing `timebomb.wsgi` to the end of the first
+response, measured in fresh interpreters. Steady state is the p50/p99 of many
+requests per view through the same WSGI application.
+
+    DJANGO_SECRET_KEY=x python scripts/benchmark.py --settings timebomb.settings_prod
+    python scripts/benchmark.py --settings timebomb.settings --requests 500
+
+Uses the database configured by the settings (DATABASE_URL); it only reads.
+Requests are sent with the `--host` Host header, which is also the default
+DJANGO_ALLOWED_HOSTS. Views that don't answer 200 are reported and make the
+script exit with status 1: their timings are not meaningful.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COLD_START = '''
+import json, sys, time
+t0 = time.perf_counter()
+from timebomb.wsgi import application
+t1 = time.perf_counter()
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': sys.argv[2]}
+from wsgiref.util import setup_testing_defaults
+setup_testing_defaults(environ)
+status = []
+body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+t2 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'first_response': t2 - t1, 'total': t2 - t0, 'status': status[0]}))
+'''
+
+
+def request(application, path, host):
+    environ = {'PATH_INFO': path, 'HTTP_HOST': host, 'wsgi.input': BytesIO()}
+    setup_testing_defaults(environ)
+    status = []
+    start = time.perf_counter()
+    body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+    elapsed = time.perf_counter() - start
+    return status[0], len(body), elapsed
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def cold_start(settings, path, host, runs):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings)
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', COLD_START, path, host], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--settings', default='timebomb.settings', help='DJANGO_SETTINGS_MODULE to benchmark')
+    parser.add_argument('--requests', type=int, default=200, help='requests per view for the steady state')
+    parser.add_argument('--cold-runs', type=int, default=5, help='fresh interpreters for the cold start')
+    parser.add_argument('--host', default='localhost', help='Host header of the requests')
+    args = parser.parse_args()
+    os.environ.setdefault('DJANGO_ALLOWED_HOSTS', args.host)
+    failed = []
+
+    cold = cold_start(args.settings, '/', args.host, args.cold_runs)
+    print(f'cold start ({args.settings}, {args.cold_runs} runs, status {cold[0]["status"]})')
+    for key in ('import', 'first_response', 'total'):
+        print(f'  {key:<15} median {statistics.median(r[key] for r in cold) * 1000:8.1f} ms')
+    if not cold[0]['status'].startswith('200'):
+        failed.append('/ (cold start)')
+
+    sys.path.insert(0, str(ROOT))
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    from timebomb.wsgi import application
+    from game.models import Club, Game, Player
+
+    paths = ['/', '/stats/', '/players/']
+    # requests without a session are served by the oldest club (game/middleware.py)
+    club = Club.objects.order_by('id').first()
+    player = Player.objects.filter(club=club).order_by('id').first()
+    game = Game.objects.filter(club=club).order_by('-id').first()
+    if player:
+        paths.append(f'/player/{player.id}/')
+    if game:
+        paths += [f'/game/{game.id}/', f'/manage/{game.id}/', f'/edit_game/{game.id}/']
+
+    print(f'\nsteady state ({args.requests} requests per view, after 1 warm-up request)')
+    print(f'  {"view":<22} {"status":<8} {"p50 ms":>8} {"p99 ms":>8} {"max ms":>8}')
+    for path in paths:
+        status, _, _ = request(application, path, args.host)
+        if not status.startswith('200'):
+            # an error page is fast to render: its timings would look like a fast view
+            print(f'  {path:<22} {status.split()[0]:<8} not measured')
+            failed.append(path)
+            continue
+        timings = []
+        for _ in range(args.requests):
+            status, _, elapsed = request(application, path, args.host)
+            timings.append(elapsed * 1000)
+        print(f'  {path:<22} {status.split()[0]:<8} {percentile(timings, 50):8.2f} '
+              f'{percentile(timings, 99):8.2f} {max(timings):8.2f}')
+
+    if failed:
+        print(f'\nWARNING: no 200 response from {", ".join(failed)} (missing `createcachetable`, '
+              f'DJANGO_ALLOWED_HOSTS, data?)', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
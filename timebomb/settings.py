@@ -25,8 +25,11 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # profiles the request when a staff user adds ?_profile (see game/profiling.py)
+    'game.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'game.middleware.CurrentClubMiddleware',
 ]
 
 ROOT_URLCONF = 'timebomb.urls'
@@ -42,6 +45,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'game.context_processors.clubs',
             ],
         },
     },
@@ -65,3 +69,26 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# bearer token letting scripts POST to /record_game/ and /record_games/ without a CSRF token
+# (disabled when empty)
+RECORD_API_TOKEN = os.environ.get('DJANGO_RECORD_TOKEN', '')
+
+# request profiles written by game.profiling.ProfilingMiddleware, only the most recent are kept
+PROFILE_DIR = Path(os.environ.get('DJANGO_PROFILE_DIR', BASE_DIR / 'profiles'))
+PROFILE_KEEP = int(os.environ.get('DJANGO_PROFILE_KEEP', 50))
+
+# debug traces of the game views (logger.debug) are printed on the console in development
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'game': {
+            'handlers': ['console'],
+            'level': os.environ.get('DJANGO_LOG_LEVEL', 'DEBUG' if DEBUG else 'WARNING'),
+        },
+    },
+}
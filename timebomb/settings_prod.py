@@ -0,0 +1,54 @@
+"""Production settings: `DJANGO_SETTINGS_MODULE=timebomb.settings_prod`.
+
+Same as `timebomb.settings` but with DEBUG off, persistent database
+connections, the cached template loader (templates are compiled when the WSGI
+application starts, see `timebomb/wsgi.py`) and hashed, pre-compressed static
+files (`python manage.py collectstatic`).
+"""
+import os
+from pathlib import Path
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, LOGGING, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+# comma-separated host names, required like the secret key (no catch-all default)
+ALLOWED_HOSTS = os.environ['DJANGO_ALLOWED_HOSTS'].split(',')
+
+# keep database connections open between requests, checked before reuse
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DJANGO_CONN_MAX_AGE', 600))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# templates are parsed once per process and kept in memory
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATES[0]['OPTIONS']['context_processors'] = [
+    cp for cp in TEMPLATES[0]['OPTIONS']['context_processors']
+    if cp != 'django.template.context_processors.debug'
+]
+# compile every template when the WSGI application is loaded rather than on first use
+PRECOMPILE_TEMPLATES = True
+
+# hashed file names (long cache lifetime) + .gz copies for the web server (e.g. nginx gzip_static)
+STATIC_ROOT = Path(os.environ.get('DJANGO_STATIC_ROOT', BASE_DIR / 'staticfiles'))
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'timebomb.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# stats caches are shared by all the worker processes (`python manage.py createcachetable`)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'game_cache',
+    },
+}
+
+LOGGING['loggers']['game']['level'] = os.environ.get('DJANGO_LOG_LEVEL', 'WARNING')
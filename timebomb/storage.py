@@ -0,0 +1,32 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+# text assets worth compressing (images/fonts are already compressed)
+COMPRESSIBLE = ('.css', '.js', '.json', '.svg', '.txt', '.html', '.map', '.xml')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes a `.gz` copy of each text asset.
+
+    The web server can then serve the pre-compressed file (nginx `gzip_static on;`)
+    instead of compressing it on every request.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and hashed_name and not isinstance(processed, Exception):
+                for path in {name, hashed_name}:
+                    if path.endswith(COMPRESSIBLE):
+                        self._write_gzip(path)
+            yield name, hashed_name, processed
+
+    def _write_gzip(self, name):
+        source = self.path(name)
+        with open(source, 'rb') as f:
+            data = f.read()
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        # not worth it for tiny files
+        if len(compressed) < len(data):
+            with open(source + '.gz', 'wb') as f:
+                f.write(compressed)
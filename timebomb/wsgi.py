@@ -1,5 +1,23 @@
 import os
+from pathlib import Path
+
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'timebomb.settings')
 application = get_wsgi_application()
+
+
+def precompile_templates():
+    """Load every project/app template once so the cached loader holds them before the first request."""
+    from django.template import engines
+    from django.template.utils import get_app_template_dirs
+
+    for engine in engines.all():
+        for directory in list(engine.dirs) + list(get_app_template_dirs('templates')):
+            for path in Path(directory).rglob('*.html'):
+                engine.get_template(path.relative_to(directory).as_posix())
+
+
+if getattr(settings, 'PRECOMPILE_TEMPLATES', False):
+    precompile_templates()